@@ -0,0 +1,203 @@
+"""
+per-function prompt artifacts.
+
+evocation prompts are built from a function's source (minus our
+decorators), its definition (signature and docstring), its docstring and
+its return annotation. deriving these means reading and tokenizing the
+source file, so they are derived once per function, lazily, from a
+single parse of its source, and cached. the cache is keyed weakly by the
+function and invalidated when its code (or, for objects like Dynamic that
+carry their source, that source) is replaced.
+"""
+import ast
+import io
+import re
+import textwrap
+import threading
+import tokenize
+from functools import cached_property
+from inspect import Signature, get_annotations, getdoc, signature
+from typing import Any, Callable, Optional
+from weakref import WeakKeyDictionary, ref
+
+from antiscope.utilz import EXPECTED_DECORATORS, digsource
+
+# names of our decorators, as they appear in decorator expressions
+DECORATOR_NAMES = frozenset(d.lstrip("@") for d in EXPECTED_DECORATORS)
+
+
+def format_type(type_) -> str:
+    if isinstance(type_, type):
+        return type_.__name__
+    else:
+        return re.sub(rf"(typing|types)\.", "", str(type_))
+
+
+def _decorator_name(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+def _function_node(source: str) -> Optional[ast.AST]:
+    try:
+        tree = ast.parse(textwrap.dedent(source))
+    except SyntaxError:
+        return None
+    return next(
+        (
+            node for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        ),
+        None,
+    )
+
+
+def strip_decorators(source: str, node: Optional[ast.AST]) -> str:
+    """source without the lines of our decorators on the function node"""
+    if node is None:
+        # not parseable by itself: fall back to matching lines
+        for decorator in EXPECTED_DECORATORS:
+            source = re.sub(f"{decorator}.*\n", "", source)
+        return source
+    drop = set()
+    for decorator in node.decorator_list:
+        if _decorator_name(decorator) in DECORATOR_NAMES:
+            drop.update(range(decorator.lineno, decorator.end_lineno + 1))
+    if not drop:
+        return source
+    lines = source.splitlines(keepends=True)
+    return "".join(
+        line for i, line in enumerate(lines, 1) if i not in drop
+    )
+
+
+def header_text(source: str, node: Optional[ast.AST]) -> str:
+    """the function's 'def ...:' header, as written"""
+    if node is None:
+        return re.search(
+            r"def.*?\) ?(-> ?(\w|[\[\]])*?[^\n:]*)?:",
+            source,
+            re.M + re.DOTALL,
+        ).group()
+    # positions are in the dedented source; the text comes from the original
+    lines, dedented = source.splitlines(keepends=True), textwrap.dedent(source)
+    indent = len(lines[0]) - len(dedented.splitlines(keepends=True)[0])
+    # from the "def" (not any "async" before it)
+    start, depth = None, 0
+    for token in tokenize.generate_tokens(io.StringIO(dedented).readline):
+        if start is None:
+            if (token.start >= (node.lineno, node.col_offset)) and (
+                token.string == "def"
+            ):
+                start = token.start
+            continue
+        if token.type != tokenize.OP:
+            continue
+        if token.string in "([{":
+            depth += 1
+        elif token.string in ")]}":
+            depth -= 1
+        elif (token.string == ":") and (depth == 0):
+            end = token.end
+            break
+    else:
+        raise ValueError("no end to the function header")
+    (first, begin), (last, stop) = start, end
+    begin, stop = begin + indent, stop + indent
+    if first == last:
+        return lines[first - 1][begin:stop]
+    return "".join(
+        [lines[first - 1][begin:]]
+        + lines[first:last - 1]
+        + [lines[last - 1][:stop]]
+    )
+
+
+class FunctionArtifacts:
+    """prompt artifacts of a function, each derived on first use"""
+
+    def __init__(self, func: Callable):
+        # not a strong reference: the cache is keyed weakly by func
+        try:
+            self._func = ref(func)
+        except TypeError:
+            self._func = lambda: func
+        self.identity = _identity(func)
+
+    @property
+    def func(self) -> Callable:
+        return self._func()
+
+    @cached_property
+    def source(self) -> str:
+        return digsource(self.func)
+
+    @cached_property
+    def node(self) -> Optional[ast.AST]:
+        return _function_node(self.source)
+
+    @cached_property
+    def stripped_source(self) -> str:
+        """source without our decorators"""
+        return strip_decorators(self.source, self.node)
+
+    @cached_property
+    def header(self) -> str:
+        return header_text(self.source, self.node)
+
+    @cached_property
+    def definition(self) -> str:
+        """header and docstring (see utilz.getdef)"""
+        if self.func.__doc__ is None:
+            return self.header
+        return self.header + '\n    """' + self.func.__doc__ + '"""\n'
+
+    @cached_property
+    def docstring(self) -> Optional[str]:
+        return getdoc(self.func)
+
+    @cached_property
+    def signature(self) -> Signature:
+        return signature(self.func)
+
+    @cached_property
+    def annotations(self) -> dict[str, Any]:
+        return get_annotations(self.func)
+
+    @cached_property
+    def return_type(self) -> str:
+        """formatted return annotation ("None" if there isn't one)"""
+        return format_type(self.annotations.get("return"))
+
+
+def _identity(func: Callable):
+    """what the artifacts of func are derived from"""
+    if (source := getattr(func, "source", None)) is not None:
+        return source
+    if (code := getattr(func, "__code__", None)) is not None:
+        return code
+    return getattr(getattr(func, "func", None), "__code__", None)
+
+
+ARTIFACTS: WeakKeyDictionary = WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+def artifacts(func: Callable) -> FunctionArtifacts:
+    """
+    cached prompt artifacts for func, rederived if its code or source has
+    been replaced. objects that can't be weakly referenced aren't cached.
+    """
+    try:
+        cached = ARTIFACTS.get(func)
+    except TypeError:
+        return FunctionArtifacts(func)
+    if (cached is not None) and (cached.identity is _identity(func)):
+        return cached
+    fresh = FunctionArtifacts(func)
+    with _LOCK:
+        ARTIFACTS[func] = fresh
+    return fresh
@@ -0,0 +1,225 @@
+"""
+record / replay of API requests, for deterministic, network-free runs.
+
+a Cassette is a JSONL file of request / response pairs (with the time
+each request took). complete(), acomplete() and complete_stream() consult
+the cassette named by the "cassette" setting before making a request:
+
+"record": make every request, appending each to the cassette (which is
+    started afresh).
+"replay": serve every request from the cassette, never the network; a
+    request with no recorded match raises CassetteMiss.
+"auto": serve matched requests from the cassette, make and record the
+    rest.
+
+matching is "strict" (same endpoint, prompt or messages, and API kwargs)
+or "lenient" (same endpoint, model and prompt or messages, ignoring other
+kwargs and differences in whitespace). a request recorded several times
+is replayed in recorded order, the last response repeating. replayed
+responses arrive at once, or, if latency is given, after that multiple
+of the time the recorded request took.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import (
+    Any, Awaitable, Callable, Literal, Mapping, Optional, Union
+)
+
+from antiscope.response_cache import request_key
+
+CassetteMode = Literal["record", "replay", "auto"]
+Matching = Literal["strict", "lenient"]
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def lenient_key(kind: str, payload: Any, kwargs: Mapping) -> str:
+    """
+    request_key() of a request, ignoring all kwargs but the model, and
+    runs of whitespace in the prompt / messages
+    """
+    if isinstance(payload, str):
+        payload = " ".join(payload.split())
+    else:
+        payload = [
+            {"role": m["role"], "content": " ".join(m["content"].split())}
+            for m in payload
+        ]
+    return request_key(kind, payload, {"model": kwargs.get("model")})
+
+
+class Cassette:
+    """
+    request / response pairs recorded to, and replayed from, a JSONL file
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        mode: CassetteMode = "auto",
+        match: Matching = "strict",
+        latency: Optional[float] = None,
+    ):
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError(f"unknown cassette mode {mode}")
+        if match not in ("strict", "lenient"):
+            raise ValueError(f"unknown cassette matching {match}")
+        self.path, self.mode, self.match = Path(path), mode, match
+        self.latency = latency
+        # match key -> recorded entries, and how many have been replayed
+        self.entries: dict[str, list[dict]] = defaultdict(list)
+        self.played: dict[str, int] = defaultdict(int)
+        self.hits, self.misses, self.recorded = 0, 0, 0
+        self._lock, self._stream = threading.Lock(), None
+        if mode == "record":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text("")
+        elif self.path.exists():
+            self.load()
+
+    def key(self, kind: str, payload: Any, kwargs: Mapping) -> str:
+        if self.match == "lenient":
+            return lenient_key(kind, payload, kwargs)
+        return request_key(kind, payload, kwargs)
+
+    def load(self):
+        with self.path.open(encoding="utf-8") as stream:
+            for line in filter(None, map(str.strip, stream)):
+                entry = json.loads(line)
+                self.entries[
+                    self.key(entry["kind"], entry["payload"], entry["kwargs"])
+                ].append(entry)
+
+    def find(self, kind: str, payload: Any, kwargs: Mapping):
+        """
+        the next recorded response to this request and the seconds the
+        request took, or None if there is none (or the mode is "record")
+        """
+        if self.mode == "record":
+            return None
+        key = self.key(kind, payload, kwargs)
+        with self._lock:
+            if not (entries := self.entries.get(key)):
+                self.misses += 1
+                return None
+            entry = entries[min(self.played[key], len(entries) - 1)]
+            self.played[key] += 1
+            self.hits += 1
+        from antiscope.openai_utils import load_response
+
+        response = load_response(kind, json.dumps(entry["response"]))
+        return response, entry.get("seconds", 0)
+
+    def record(
+        self, kind: str, payload: Any, kwargs: Mapping, response, seconds
+    ):
+        from antiscope.openai_utils import dump_response
+
+        entry = {
+            "kind": kind,
+            "payload": payload,
+            "kwargs": dict(kwargs),
+            "response": json.loads(dump_response(response)),
+            "seconds": round(seconds, 4),
+        }
+        line = json.dumps(entry, default=repr, ensure_ascii=False)
+        with self._lock:
+            self.entries[self.key(kind, payload, kwargs)].append(entry)
+            self.recorded += 1
+            if self._stream is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._stream = self.path.open(
+                    "a", encoding="utf-8", buffering=1
+                )
+            self._stream.write(line + "\n")
+
+    def delay(self, seconds: float) -> float:
+        """simulated latency of a replayed request that took seconds"""
+        return 0 if self.latency is None else seconds * self.latency
+
+    def missed(self, kind: str, payload: Any):
+        """raise CassetteMiss if unmatched requests may not be made"""
+        if self.mode == "replay":
+            raise CassetteMiss(
+                f"no {self.match} match for this {kind} request in "
+                f"{self.path}: {str(payload)[:200]}"
+            )
+
+    def play(
+        self, kind: str, payload: Any, kwargs: Mapping, request: Callable
+    ):
+        """replay the request, or make it with request() and record it"""
+        if (found := self.find(kind, payload, kwargs)) is not None:
+            response, seconds = found
+            if (delay := self.delay(seconds)) > 0:
+                time.sleep(delay)
+            return response
+        self.missed(kind, payload)
+        start = time.perf_counter()
+        response = request()
+        self.record(
+            kind, payload, kwargs, response, time.perf_counter() - start
+        )
+        return response
+
+    async def aplay(
+        self,
+        kind: str,
+        payload: Any,
+        kwargs: Mapping,
+        arequest: Callable[[], Awaitable],
+    ):
+        """async version of play()"""
+        if (found := self.find(kind, payload, kwargs)) is not None:
+            response, seconds = found
+            if (delay := self.delay(seconds)) > 0:
+                import asyncio
+
+                await asyncio.sleep(delay)
+            return response
+        self.missed(kind, payload)
+        start = time.perf_counter()
+        response = await arequest()
+        self.record(
+            kind, payload, kwargs, response, time.perf_counter() - start
+        )
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def __repr__(self):
+        return (
+            f"Cassette({str(self.path)!r}, mode={self.mode!r}, "
+            f"match={self.match!r}, {self.hits} hits, {self.misses} misses, "
+            f"{self.recorded} recorded)"
+        )
+
+
+_CASSETTES: dict[Path, Cassette] = {}
+_CASSETTES_LOCK = threading.Lock()
+
+
+def get_cassette(
+    spec: Union[Cassette, str, Path, None]
+) -> Optional[Cassette]:
+    """
+    resolve the value of the 'cassette' setting to a Cassette (or None).
+    a str or Path names a cassette file, used in "auto" mode; cassettes
+    are shared by path within a process.
+    """
+    if (spec is None) or isinstance(spec, Cassette):
+        return spec
+    path = Path(spec)
+    with _CASSETTES_LOCK:
+        if path not in _CASSETTES:
+            _CASSETTES[path] = Cassette(path)
+        return _CASSETTES[path]
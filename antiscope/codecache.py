@@ -0,0 +1,124 @@
+"""
+hash-keyed cache of code objects compiled from dynamically-generated source.
+
+an in-memory layer makes identical sources compile once per process; an
+optional on-disk layer (marshal files stamped with the interpreter's
+bytecode magic number, like __pycache__) lets warm restarts skip
+compilation entirely.
+"""
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import tempfile
+from pathlib import Path
+from types import CodeType
+from typing import Callable, Optional, Union
+
+MAGIC = importlib.util.MAGIC_NUMBER
+
+
+def source_digest(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def dump_code(code: CodeType) -> bytes:
+    """serialize code, stamped with this interpreter's bytecode magic"""
+    return MAGIC + marshal.dumps(code)
+
+
+def load_code(blob: bytes) -> Optional[CodeType]:
+    """
+    code serialized by dump_code(), or None if it was serialized by an
+    interpreter with different bytecode, or is corrupt
+    """
+    if not blob.startswith(MAGIC):
+        return None
+    try:
+        code = marshal.loads(blob[len(MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    return code if isinstance(code, CodeType) else None
+
+
+class CodeCache:
+    def __init__(
+        self,
+        path: Union[str, Path, None] = None,
+        maxsize: Optional[int] = 4096,
+    ):
+        self.path = Path(path) if path is not None else None
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self.maxsize = maxsize
+        self.memory: dict[str, CodeType] = {}
+        self.hits, self.misses = 0, 0
+
+    def _diskpath(self, digest: str) -> Path:
+        return self.path / f"{digest}.{sys.implementation.cache_tag}.marshal"
+
+    def _read(self, digest: str) -> Optional[CodeType]:
+        if self.path is None:
+            return None
+        try:
+            blob = self._diskpath(digest).read_bytes()
+        except OSError:
+            return None
+        return load_code(blob)
+
+    def _write(self, digest: str, code: CodeType):
+        if self.path is None:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=f".{digest}.")
+        try:
+            with os.fdopen(fd, "wb") as stream:
+                stream.write(dump_code(code))
+            os.replace(tmp, self._diskpath(digest))
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
+
+    def _remember(self, digest: str, code: CodeType):
+        if (self.maxsize is not None) and (len(self.memory) >= self.maxsize):
+            # dicts are insertion-ordered, so this drops the oldest entry
+            self.memory.pop(next(iter(self.memory)), None)
+        self.memory[digest] = code
+
+    def get(
+        self,
+        source: str,
+        compiler: Callable[[str], CodeType],
+        digest: Optional[str] = None,
+    ) -> CodeType:
+        """
+        return the cached code object for source, calling compiler(source)
+        on a miss.
+        """
+        digest = digest if digest is not None else source_digest(source)
+        if (code := self.memory.get(digest)) is not None:
+            self.hits += 1
+            return code
+        if (code := self._read(digest)) is None:
+            self.misses += 1
+            code = compiler(source)
+            self._write(digest, code)
+        else:
+            self.hits += 1
+        self._remember(digest, code)
+        return code
+
+    def clear(self, disk: bool = False):
+        self.memory.clear()
+        if disk is True and self.path is not None:
+            for file in self.path.glob("*.marshal"):
+                file.unlink(missing_ok=True)
+
+
+CODE_CACHE = CodeCache(os.environ.get("ANTISCOPE_CODE_CACHE"))
+
+
+def set_code_cache_dir(path: Union[str, Path, None]):
+    """enable (or, with None, disable) the on-disk layer of CODE_CACHE"""
+    CODE_CACHE.path = Path(path) if path is not None else None
+    if CODE_CACHE.path is not None:
+        CODE_CACHE.path.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,240 @@
+"""
+token-aware chat message context.
+
+a MessageContext holds a chat's messages along with each message's token
+count, taken once as the message is added, so adding a turn is O(1) and
+fitting the context to a token window costs only the messages that are
+sent. fit() returns the messages to send: pinned messages (the system
+message, plus any pinned as anchors) and as many of the most recent turns
+as fit. with strategy "summarize", the turns that don't fit are replaced
+by a single summary message. the default summarizer is local (excerpts
+of each dropped turn, made once per message); summaries are cached until
+the set of dropped turns changes.
+
+a MessageContext can be passed as the "message_context" setting, and is
+what Conversation keeps its messages in.
+"""
+from typing import Callable, Iterable, Literal, Mapping, Optional
+
+from antiscope.tokens import (
+    CHARS_PER_TOKEN,
+    CHAT_MESSAGE_OVERHEAD,
+    CHAT_REPLY_OVERHEAD,
+    context_window,
+    count_tokens,
+)
+
+# tokens reserved for the summary of dropped turns
+SUMMARY_TOKENS = 256
+# words of each dropped turn kept by the default summarizer
+EXCERPT_WORDS = 24
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+Strategy = Literal["slide", "summarize"]
+Summarizer = Callable[[list[dict[str, str]]], str]
+
+
+def excerpt(message: Mapping[str, str]) -> str:
+    """one line of the default summary: the opening words of a message"""
+    words = message["content"].split()
+    text = " ".join(words[:EXCERPT_WORDS])
+    if len(words) > EXCERPT_WORDS:
+        text += " ..."
+    return f"{message['role']}: {text}"
+
+
+class MessageContext:
+    """
+    chat messages with per-message token counts, fitted to a window of
+    `window` prompt tokens when sent. if window is None, it is the model's
+    context window less max_tokens; if that is unknown too, nothing is
+    ever dropped. summarizer, if given, makes the summary of dropped turns
+    for strategy "summarize" from a list of them.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        system: Optional[str] = None,
+        window: Optional[int] = None,
+        max_tokens: int = 0,
+        strategy: Strategy = "slide",
+        summarizer: Optional[Summarizer] = None,
+    ):
+        if strategy not in ("slide", "summarize"):
+            raise ValueError(f"unknown context strategy {strategy}")
+        self.model, self.system, self.max_tokens = model, system, max_tokens
+        self._window = window
+        self.strategy, self.summarizer = strategy, summarizer
+        self.reset()
+
+    @classmethod
+    def from_settings(
+        cls, settings: Mapping, messages: Iterable[Mapping] = ()
+    ) -> "MessageContext":
+        """
+        context configured by the "model", "system", "max_tokens",
+        "context_window", "context_strategy" and "context_summarizer"
+        settings. if messages are given, they replace the system message.
+        """
+        messages = list(messages)
+        context = cls(
+            settings["model"],
+            None if messages else settings.get("system"),
+            settings.get("context_window"),
+            settings.get("max_tokens", 0),
+            settings.get("context_strategy", "slide"),
+            settings.get("context_summarizer"),
+        )
+        for message in messages:
+            context.append(message["role"], message["content"])
+        return context
+
+    def reset(self):
+        self.messages: list[dict[str, str]] = []
+        self.tokens: list[int] = []
+        self.pinned: set[int] = set()
+        self.total = CHAT_REPLY_OVERHEAD
+        self._excerpts: list[Optional[str]] = []
+        # ((cut, pinned messages before it), summary message)
+        self._summary: Optional[tuple[tuple, dict]] = None
+        if self.system is not None:
+            self.append("system", self.system)
+
+    @property
+    def window(self) -> Optional[int]:
+        """prompt tokens allowed"""
+        if self._window is not None:
+            return self._window
+        if (size := context_window(self.model)) is None:
+            return None
+        return size - self.max_tokens
+
+    @window.setter
+    def window(self, window: Optional[int]):
+        self._window = window
+
+    def count(self, content: str) -> int:
+        return CHAT_MESSAGE_OVERHEAD + count_tokens(content, self.model)
+
+    def append(self, role: str, content: str, pin: bool = False):
+        self.messages.append({"role": role, "content": content})
+        self.tokens.append(tokens := self.count(content))
+        self._excerpts.append(None)
+        self.total += tokens
+        if pin or (role == "system"):
+            self.pinned.add(len(self.messages) - 1)
+
+    def addmsg(self, content: str):
+        self.append("user", content)
+
+    def addreply(self, content: str):
+        self.append("assistant", content)
+
+    def pin(self, ix: int = -1):
+        """always send the message at index ix (by default, the last)"""
+        self.pinned.add(range(len(self.messages))[ix])
+
+    def unpin(self, ix: int = -1):
+        self.pinned.discard(range(len(self.messages))[ix])
+
+    def pop(self, n: int = 1):
+        """remove the last n messages"""
+        for _ in range(min(n, len(self.messages))):
+            self.messages.pop()
+            self.total -= self.tokens.pop()
+            self._excerpts.pop()
+            self.pinned.discard(len(self.messages))
+        self._summary = None
+
+    def fit(self, extra: Optional[Mapping[str, str]] = None) -> list[dict]:
+        """
+        the messages to send (followed by extra, if given, which is sent
+        but not kept), fitted to the window. the work done is proportional
+        to the number of messages sent, not the length of the context.
+        """
+        extra_tokens = 0 if extra is None else self.count(extra["content"])
+        tail = [] if extra is None else [dict(extra)]
+        if ((window := self.window) is None) or (
+            self.total + extra_tokens <= window
+        ):
+            return self.messages + tail
+        budget = window - extra_tokens
+        budget -= sum(self.tokens[ix] for ix in self.pinned)
+        budget -= CHAT_REPLY_OVERHEAD
+        if self.strategy == "summarize":
+            budget -= SUMMARY_TOKENS + CHAT_MESSAGE_OVERHEAD
+        ix, kept = len(self.messages) - 1, []
+        while ix >= 0:
+            if ix not in self.pinned:
+                if self.tokens[ix] > budget:
+                    break
+                budget -= self.tokens[ix]
+                kept.append(ix)
+            ix -= 1
+        # messages before the most recent that didn't fit are dropped
+        cut = ix + 1
+        kept.extend(self.pinned)
+        kept.sort()
+        messages = [self.messages[k] for k in kept]
+        dropped = cut - sum(p < cut for p in self.pinned)
+        if (self.strategy == "summarize") and (dropped > 0):
+            ix = next(
+                (i for i, k in enumerate(kept) if k >= cut), len(kept)
+            )
+            messages.insert(ix, self.summarize(cut))
+        return messages + tail
+
+    def summarize(self, cut: int) -> dict[str, str]:
+        """summary message for the unpinned messages before index cut"""
+        if self.summarizer is None:
+            return {"role": "system", "content": self._excerpt_summary(cut)}
+        key = (cut, frozenset(p for p in self.pinned if p < cut))
+        if (self._summary is None) or (self._summary[0] != key):
+            dropped = [
+                m for i, m in enumerate(self.messages[:cut])
+                if i not in self.pinned
+            ]
+            text = self.summarizer(dropped)
+            self._summary = (key, {"role": "system", "content": text})
+        return self._summary[1]
+
+    def _excerpt_summary(self, cut: int) -> str:
+        # the most recent excerpts that fit in SUMMARY_TOKENS
+        room = SUMMARY_TOKENS * CHARS_PER_TOKEN - len(SUMMARY_HEADER)
+        lines, ix = [], cut - 1
+        while ix >= 0:
+            if ix not in self.pinned:
+                if self._excerpts[ix] is None:
+                    self._excerpts[ix] = excerpt(self.messages[ix])
+                if (room := room - len(self._excerpts[ix]) - 1) < 0:
+                    break
+                lines.append(self._excerpts[ix])
+            ix -= 1
+        return "\n".join([SUMMARY_HEADER] + lines[::-1])
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __getitem__(self, ix):
+        return self.messages[ix]
+
+    def __repr__(self):
+        return (
+            f"MessageContext({len(self)} messages, {self.total} tokens, "
+            f"window={self.window}, strategy={self.strategy!r})"
+        )
+
+
+def fit_messages(
+    messages: Iterable[Mapping], settings: Mapping
+) -> list[dict[str, str]]:
+    """
+    messages fitted to the window the settings describe (see
+    MessageContext.from_settings()). counts every message, so prefer
+    keeping a MessageContext where messages accumulate.
+    """
+    return MessageContext.from_settings(settings, messages).fit()
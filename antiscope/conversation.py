@@ -1,21 +1,21 @@
-import datetime as dt
 import re
+import threading
+import time
+from collections import deque
 
+from antiscope.context import MessageContext
+from antiscope.history import HISTORY_SIZE, history_for
 from antiscope.openai_settings import DEFAULT_SETTINGS, CHAT_MODELS
-from antiscope.openai_utils import (
-    chatinit,
-    addmsg,
-    addreply,
-    get_usage,
-    get_cost,
-    complete,
-    getchoice,
-)
-from rich.errors import MarkupError
-import rich.markup
+from antiscope.openai_utils import complete, complete_stream, getchoice
+from antiscope.tokens import count_prompt_tokens, count_tokens
+
+# frames per second when rendering streamed replies
+LIVE_REFRESH = 12
 
 
 def striptags(text):
+    import rich.markup
+
     stripon, stripped = False, []
     for position, text, tag in rich.markup._parse(text):
         if tag is None:
@@ -27,7 +27,13 @@ def striptags(text):
 class Conversation:
     """
     implements simple UI for interactive chat completion.
-    primarily intended for dev/testing.
+    primarily intended for dev/testing. messages are kept in a
+    MessageContext, so each turn sends only what fits the context window
+    (see antiscope.context).
+
+    with the "stream" setting (or say(..., stream=True)), replies are
+    rendered as they arrive. a streamed reply can be cut short with ctrl-c
+    or cancel(); the partial reply is kept as the reply to that turn.
     """
 
     def __init__(self, settings=DEFAULT_SETTINGS, **api_kwargs):
@@ -36,18 +42,28 @@ class Conversation:
                 f'{settings["model"]} does not support chat completions.'
             )
         self.settings = settings | api_kwargs
-        self.messages = chatinit(system=settings.get("system"))
-        self.transcript = self.messages
-        self.history, self.print_history = [], []
+        self.context = MessageContext.from_settings(self.settings)
+        self.transcript = list(self.context.messages)
+        self.history = history_for(self.settings)
+        self.print_history = deque(maxlen=HISTORY_SIZE)
         from rich.console import Console
 
         self.console = Console(width=68)
+        self._cancel = threading.Event()
+
+    @property
+    def messages(self):
+        return self.context.messages
 
     def addmsg(self, msg):
-        self.messages = addmsg(msg, self.messages)
+        self.context.addmsg(msg)
 
     def addreply(self, msg):
-        self.messages = addreply(msg, self.messages)
+        self.context.addreply(msg)
+
+    def pin(self, ix=-1):
+        """always send the message at index ix (by default, the last)"""
+        self.context.pin(ix)
 
     def transcribe(self, msg, role="program"):
         self.transcript.append({"role": role, "content": msg})
@@ -62,6 +78,8 @@ class Conversation:
         self.print_history.append(msg)
         if self.verbose is False:
             return
+        from rich.errors import MarkupError
+
         try:
             self.console.print(msg)
         except MarkupError:
@@ -70,27 +88,25 @@ class Conversation:
             )
 
     def undo(self):
-        self.messages = self.messages[:-2]
-        self.history.append(
-            {"event": "undo", "time": dt.datetime.now().isoformat()[:-3]}
-        )
+        self.context.pop(2)
+        self.history.record("undo")
         self.transcript.append(
             {"role": "program", "content": "last action undone."}
         )
 
     def reset(self):
-        self.messages = chatinit(system=self.settings.get("system"))
+        self.context.reset()
         self.transcript.append(
             {"role": "program", "content": "conversation reset."}
         )
 
     @property
     def usage(self):
-        return get_usage(self.history)
+        return self.history.usage
 
     @property
     def cost(self):
-        return get_cost(self.settings["model"], self.history)
+        return self.history.cost
 
     def print_transcript(self, which="transcript"):
         to_print = self.transcript if which == "transcript" else self.messages
@@ -104,31 +120,108 @@ class Conversation:
         self.print(text)
 
     def say(self, message: str, **api_kwargs):
-        messages = addmsg(message, self.messages)
-        response, _ = complete(messages, self.settings | api_kwargs)
+        settings = self.settings | api_kwargs
+        messages = self.context.fit({"role": "user", "content": message})
+        cancelled = False
+        if settings.get("stream") is True:
+            response, cancelled = self._stream(messages, settings)
+        else:
+            response, _ = complete(messages, settings)
         status = "ok"
         try:
             reply = getchoice(response)
             term_msg = ""
         except IOError as ioe:
-            status = str(ioe)
+            status = "cancelled" if cancelled else str(ioe)
             reply = getchoice(response, raise_truncated=False)
-            term_msg = f"[dark_orange bold]\n\n{str(ioe)}"
+            term_msg = f"[dark_orange bold]\n\n{status}"
         self.addmsg(message)
         self.addreply(reply)
-        self.history.append(
-            {
-                "event": "api response",
-                "content": response,
-                "time": dt.datetime.now().isoformat()[:-3],
-                "settings": self.settings | api_kwargs,
-                "status": status,
-            }
+        self.history.record(
+            "api response",
+            message,
+            response,
+            model=settings["model"],
+            status=status,
         )
-        self.transcript = addmsg(message, self.transcript)
-        self.transcript = addreply(reply, self.transcript)
+        self.transcript.append({"role": "user", "content": message})
+        self.transcript.append({"role": "assistant", "content": reply})
         self._maybe_print(reply + term_msg)
 
+    def cancel(self):
+        """stop the reply being streamed (e.g. from another thread)"""
+        self._cancel.set()
+
+    def _stream(self, messages, settings):
+        """
+        stream a reply, rendering it as it arrives if verbose. returns the
+        assembled response and whether the reply was cut short.
+        """
+        self._cancel.clear()
+        stream, cancelled = complete_stream(messages, settings), False
+        chunks, live = iter(stream), None
+        if self.verbose is True:
+            from rich.live import Live
+
+            live = Live(
+                console=self.console,
+                transient=True,
+                refresh_per_second=LIVE_REFRESH,
+            )
+            live.start()
+        rendered = 0.0
+        try:
+            for _ in chunks:
+                # render only as often as the screen is refreshed
+                if (live is not None) and (
+                    time.monotonic() - rendered >= 1 / LIVE_REFRESH
+                ):
+                    live.update(self._render_partial(stream.text))
+                    rendered = time.monotonic()
+                if self._cancel.is_set():
+                    cancelled = True
+                    break
+        except KeyboardInterrupt:
+            cancelled = True
+        finally:
+            # closing the stream assembles stream.response from what arrived
+            chunks.close()
+            if live is not None:
+                live.stop()
+        response = stream.response
+        if response.usage is None:
+            # no usage report for a cut-off stream: count it ourselves
+            from openai.types import CompletionUsage
+
+            prompt_tokens = count_prompt_tokens(messages, settings["model"])
+            completion_tokens = count_tokens(stream.text, settings["model"])
+            response.usage = CompletionUsage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            )
+        return response, cancelled
+
+    def _render_partial(self, text):
+        """
+        the last screenful of a partial reply. markup that doesn't parse
+        (e.g. because a tag is still arriving, or was cut off) is rendered
+        as plain text; the finished reply goes through print() as usual.
+        """
+        from rich.errors import MarkupError
+        from rich.text import Text
+
+        rows, width = self.console.height - 1, self.console.width
+        # only the tail can be on screen: at most rows lines of width chars
+        # (twice that, to leave room for markup)
+        tail = "\n".join(text[-2 * rows * width:].split("\n")[-rows:])
+        try:
+            rendered = Text.from_markup(tail)
+        except MarkupError:
+            rendered = Text(tail)
+        lines = rendered.wrap(self.console, width)
+        return Text("\n").join(lines[-rows:])
+
     def _maybe_print(self, msg):
         if self.verbose is True:
             self.print(msg)
@@ -144,6 +237,7 @@ class Conversation:
 
     def settok(self, tokens):
         self.settings["max_tokens"] = tokens
+        self.context.max_tokens = tokens
 
     verbose = True
     temperature = property(gettemp, settemp)
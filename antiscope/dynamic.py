@@ -1,9 +1,19 @@
 from inspect import signature, Signature
+from pickle import PicklingError
 from types import FunctionType
 from typing import Optional
 
+from antiscope.codecache import dump_code, load_code, source_digest
+from antiscope.history import error_log
+from antiscope.instrument import span
 from antiscope.utilz import (
-    digsource, dontcare, compile_source, define, exc_report
+    compact_report,
+    compile_source,
+    define,
+    digsource,
+    exc_report,
+    globals_module,
+    module_globals,
 )
 
 
@@ -17,13 +27,14 @@ class UnreadyError(ValueError):
     pass
 
 
-# TODO, maybe: optimization stuff re: kwarg mapping, etc. -- but if you wanted
-#  to engage in really high call volume, you could also just explicitly call
-#  the wrapped function...
 class Dynamic:
     """
     simple class to help manage function definition / execution from
     dynamically-generated source.
+
+    once a function is loaded, calls that don't override optionality go
+    straight to a callable bound at load time (self._fast): the function
+    itself, or self._call_carelessly if optional.
     """
     def __init__(
         self,
@@ -35,7 +46,7 @@ class Dynamic:
     ):
         self.globals_ = globals_
         self.optional = optional
-        self.errors = []
+        self.errors = error_log()
         self.load_on_call = load_on_call
         self.lazy = lazy
         self.call_fail = False
@@ -61,8 +72,16 @@ class Dynamic:
     def compile_source(self, recompile=True):
         if (recompile is False) and (self.code is not None):
             raise AlreadyLoadedError("self.code already compiled")
+        digest = None
+        if isinstance(self.source, str):
+            digest = source_digest(self.source)
+            # source hasn't changed since we last compiled it
+            if (self.code is not None) and (digest == self.source_digest):
+                return
         try:
-            self.code = compile_source(self.source)
+            with span("compile"):
+                self.code = compile_source(self.source, digest=digest)
+            self.source_digest = digest
         except KeyboardInterrupt:
             raise
         except Exception as ex:
@@ -72,14 +91,54 @@ class Dynamic:
     def define(self, redefine=False):
         if (self.func is not None) and (redefine is not True):
             raise AlreadyLoadedError("self.func already defined")
-        self.func = define(self.code, self.globals_)
+        with span("define"):
+            self.func = define(self.code, self.globals_)
         self.__signature__ = signature(self.func)
         self.__name__ = self.func.__name__
 
+    @property
+    def func(self) -> Optional[FunctionType]:
+        return self._func
+
+    @func.setter
+    def func(self, func: Optional[FunctionType]):
+        self._func = func
+        self._bind()
+
+    @property
+    def optional(self) -> bool:
+        return self._optional
+
+    @optional.setter
+    def optional(self, optional: bool):
+        self._optional = optional
+        self._bind()
+
+    def _bind(self):
+        """(re)bind the fast-path callable when func or optional change"""
+        if self._func is None:
+            self._fast = None
+        elif self._optional is True:
+            self._fast = self._call_carelessly
+        else:
+            self._fast = self._func
+
+    def _call_carelessly(self, *args, **kwargs):
+        try:
+            return self._func(*args, **kwargs)
+        except KeyboardInterrupt:
+            raise
+        except Exception as ex:
+            self.errors.append(
+                exc_report(ex) | {"func": self._func, "category": "call"}
+            )
+            self.call_fail = True
+
     def unload(self):
-        del self.code, self.func, self.errors
+        del self.code, self.errors
         self.call_fail, self.compile_fail = False, False
-        self.code, self.func, self.errors = None, None, []
+        self.code, self.func, self.errors = None, None, error_log()
+        self.source_digest = None
         self.__name__ = self.__class__.__name__
         self.__signature__ = None
 
@@ -91,18 +150,57 @@ class Dynamic:
         raise UnreadyError("No loaded function.")
 
     def __call__(self, *args, _optional=None, **kwargs):
+        if (_optional is None) and ((fast := self._fast) is not None):
+            return fast(*args, **kwargs)
         self._maybe_load_on_call()
         if _optional is None:
             _optional = self.optional
         if _optional is False:
             # noinspection PyUnresolvedReferences
             return self.func(*args, **kwargs)
-        try:
-            return dontcare(self.func, self.errors)(*args, **kwargs)
-        finally:
-            if len(self.errors) > 0:
-                if self.errors[-1].get('category') == 'call':
-                    self.call_fail = True
+        return self._call_carelessly(*args, **kwargs)
+
+    def __getstate__(self) -> dict:
+        """
+        pickle source, settings, compact errors and the marshaled code
+        object, but not the function itself. module globals are pickled
+        by module name and looked up again when unpickling.
+        """
+        if (self._func is not None) and (self._func.__closure__ is not None):
+            raise PicklingError(f"can't pickle closure {self._func}")
+        state = self.__dict__.copy()
+        for attr in ("_func", "_fast", "__signature__"):
+            state.pop(attr, None)
+        # the globals the function actually has (objects made by
+        # from_function() may not have them as self.globals_)
+        if self._func is not None:
+            state["globals_"] = self._func.__globals__
+        if (module := globals_module(state["globals_"])) is not None:
+            state["globals_"], state["_globals_module"] = None, module
+        state["errors"] = error_log()
+        state["errors"].extend(map(compact_report, self.errors))
+        if self.code is not None:
+            state["code"] = dump_code(self.code)
+        if self._func is not None:
+            state["_defaults"] = (
+                self._func.__defaults__, self._func.__kwdefaults__
+            )
+        return state
+
+    def __setstate__(self, state: dict):
+        state = state.copy()
+        if (module := state.pop("_globals_module", None)) is not None:
+            state["globals_"] = module_globals(module)
+        loaded, defaults = "_defaults" in state, state.pop("_defaults", None)
+        if isinstance(blob := state.get("code"), bytes):
+            state["code"] = load_code(blob)
+            if state["code"] is None:
+                # marshaled by a different interpreter; compile again
+                state["code"] = compile_source(state["source"])
+        self.__dict__.update(state)
+        if loaded is True:
+            self.define(redefine=True)
+            self._func.__defaults__, self._func.__kwdefaults__ = defaults
 
     def __str__(self):
         if self.func is None:
@@ -127,7 +225,9 @@ class Dynamic:
         return dynamic
 
     __signature__ = Signature()
-    source, code, func, __name__ = None, None, None, '<unloaded Dynamic>'
+    source, code, __name__ = None, None, '<unloaded Dynamic>'
+    source_digest = None
+    _func, _optional, _fast = None, False, None
 
 
 def test_dynamic():
@@ -2,14 +2,16 @@
 reference implementation of irrealis-mood functionality w/the OpenAI API
 """
 import ast
-import datetime as dt
 import re
-from inspect import getcallargs, get_annotations
+from functools import partial
+from inspect import getcallargs
 from types import FunctionType, MappingProxyType
 
 # noinspection PyUnresolvedReferences, PyProtectedMember
 from typing import (
     Any,
+    Iterable,
+    Iterator,
     Mapping,
     Optional,
     Sequence,
@@ -19,10 +21,17 @@ from typing import (
     Literal,
 )
 
-from cytoolz import curry
-from tiktoken import encoding_for_model
+from cytoolz import curry, keyfilter
 
+from antiscope.artifacts import artifacts, format_type
 from antiscope.dynamic import Dynamic
+from antiscope.extract import (
+    ExtractionError,
+    FALLBACK_STRIPPABLES,
+    extract_code,
+    extract_literal,
+)
+from antiscope.instrument import span
 from antiscope.irrealis import (
     Irrealis,
     ImplicationFailure,
@@ -41,41 +50,48 @@ from antiscope.openai_settings import (
     IEXEC_CHAT,
     REDEF_CHAT,
     CHATGPT_FORMAT, REVERSE_CHAT,
+    ARG_BUDGET,
+    JSON_FORMAT,
 )
 from antiscope.openai_utils import (
+    acomplete,
     complete,
+    complete_stream,
     getchoice,
     strip_codeblock,
     addmsg,
     addreply,
-    get_usage,
-    get_cost,
 )
+from antiscope.schema import (
+    SchemaError, decode, response_format, supports_json_schema
+)
+from antiscope.serializers import serialize
+from antiscope.streaming import SequenceStreamParser
+from antiscope.tokens import plan_prompt
 from antiscope.utilz import (
-    _strip_our_decorators,
-    getdef,
-    digsource,
     exc_report,
     filter_assignment,
     tabtext,
-    argformat_docstring, capture_call,
+    capture_call,
+    to_thread,
+)
+from antiscope.validation import (
+    VALIDATION_MEMORY,
+    VALIDATION_TIMEOUT,
+    ValidationError,
+    validate,
+    validation_examples,
 )
 
-FALLBACK_STRIPPABLES = "".join(('"', "'", "`", "\n", " ", "."))
-
-
-def format_type(type_):
-    if isinstance(type_, type):
-        return type_.__name__
-    else:
-        return re.sub(rf"(typing|types)\.", "", str(type_))
+# source of a call as written at its call site, or a function that finds it
+CallSource = Union[str, Callable[[], str], None]
 
 
 # TODO: add more control over chat context
 def _redefinition_request(
     func: FunctionType, _settings: Mapping = DEFAULT_SETTINGS
 ):
-    prompt = _strip_our_decorators(getdef(func))
+    prompt = artifacts(func).definition
     if _settings["model"] in CHAT_MODELS:
         return f"{REDEF_CHAT + CHATGPT_FORMAT + CHATGPT_NO}:\n{prompt}"
     return f"# use this function:\n{prompt}"
@@ -110,13 +126,13 @@ def _definition_request(
 def _reverse_request(
     func: FunctionType, _settings: Mapping = DEFAULT_SETTINGS
 ):
-    prompt = _strip_our_decorators(digsource(func))
+    prompt = artifacts(func).stripped_source
     if _settings["model"] in CHAT_MODELS:
         return f"{REVERSE_CHAT + CHATGPT_FORMAT + CHATGPT_NO}:\n{prompt}"
     raise NotImplementedError
 
 
-def request_function_definition(
+def function_definition_prompt(
     base: Union[str, FunctionType, None],
     name: Optional[str] = None,
     args_like: Optional[Sequence[Any]] = None,
@@ -125,7 +141,7 @@ def request_function_definition(
     language: str = "Python",
     performativity: Performative = "wish",
     _settings: Mapping = DEFAULT_SETTINGS,
-):
+) -> str:
     if isinstance(base, FunctionType):
         if performativity in ("wish", "command"):
             func = _redefinition_request
@@ -140,59 +156,97 @@ def request_function_definition(
         prompt = _definition_request(
             _settings, args_like, base, language, name, return_like
         )
-    return complete(prompt, _settings)
+    return prompt
 
 
-def _eventrecord(prompt, response, category) -> dict[str]:
-    return {
-        "prompt": prompt,
-        "response": response,
-        "category": category,
-        "time": dt.datetime.now().isoformat()[:-3],
-    }
-
-
-def format_calltext(func, *args, **kwargs):
-    pretty_args = {}
-    callargs = getcallargs(func, *args, **kwargs)
-    for k, v in callargs.items():
-        if isinstance(v, str):
-            pretty_args[k] = f'"""{v}"""'
-        elif v.__repr__().startswith("<"):
-            if "__name__" in dir(v):
-                pretty_args[k] = v.__name__
-                continue
-            raise TypeError(
-                (
-                    f"the __repr__ method of the object passed as the "
-                    f"argument {k} returns the value {v}, which is too ugly "
-                    f"to pass to this function. Give {k} a __name__ or a "
-                    f"prettier __repr__ method."
-                )
-            )
-        else:
-            pretty_args[k] = v.__repr__()
-    arglist, kwargdict = [], {}
-    argcount = len(locals()["args"])
-    for i, k in enumerate(pretty_args.keys()):
-        if i < argcount:
-            arglist.append(pretty_args[k])
-        else:
-            kwargdict[k] = pretty_args[k]
+def request_function_definition(
+    base: Union[str, FunctionType, None],
+    name: Optional[str] = None,
+    args_like: Optional[Sequence[Any]] = None,
+    return_like: Optional[Sequence[Any]] = None,
+    *,
+    language: str = "Python",
+    performativity: Performative = "wish",
+    _settings: Mapping = DEFAULT_SETTINGS,
+):
+    prompt = function_definition_prompt(
+        base,
+        name,
+        args_like,
+        return_like,
+        language=language,
+        performativity=performativity,
+        _settings=_settings,
+    )
+    return complete(prompt, _candidate_settings(_settings))
+
+
+async def arequest_function_definition(
+    base: Union[str, FunctionType, None],
+    name: Optional[str] = None,
+    args_like: Optional[Sequence[Any]] = None,
+    return_like: Optional[Sequence[Any]] = None,
+    *,
+    language: str = "Python",
+    performativity: Performative = "wish",
+    _settings: Mapping = DEFAULT_SETTINGS,
+):
+    # building the prompt may read and tokenize source files
+    prompt = await to_thread(
+        function_definition_prompt,
+        base,
+        name,
+        args_like,
+        return_like,
+        language=language,
+        performativity=performativity,
+        _settings=_settings,
+    )
+    return await acomplete(prompt, _candidate_settings(_settings))
+
+
+def _candidate_settings(_settings: Mapping) -> Mapping:
+    """ask for several definitions at once if _settings say to"""
+    if (candidates := _settings.get("candidates")) is None:
+        return _settings
+    return dict(_settings) | {"n": candidates}
+
+
+def _format_arg(value, name, budget):
+    try:
+        return serialize(value, budget)
+    except TypeError as te:
+        raise TypeError(f"can't format the argument {name}: {te}")
+
+
+def format_calltext(func, *args, _budget: Optional[int] = None, **kwargs):
+    """
+    text of a call to func as written (defaults aren't filled in).
+    arguments are rendered by antiscope.serializers; if _budget is not
+    None, each one is summarized to fit in roughly _budget tokens.
+    """
+    with span("format_calltext"):
+        # raises TypeError on calls that don't match func's signature
+        artifacts(func).signature.bind(*args, **kwargs)
+        pretty_args = [
+            _format_arg(arg, f"at position {i}", _budget)
+            for i, arg in enumerate(args)
+        ]
+        pretty_args += [
+            f"{k}={_format_arg(v, k, _budget)}" for k, v in kwargs.items()
+        ]
     # TODO: text wrapping or formatting or something
-    callstring = f"{func.__name__}("
-    callstring += ", ".join(arglist)
-    if (len(arglist) > 0) and (len(kwargdict) > 0):
-        callstring += ", "
-    callstring += ", ".join(f"{k}={v}" for k, v in kwargdict.items())
-    callstring += ")"
-    return callstring
+    return f"{func.__name__}({', '.join(pretty_args)})"
 
 
-def _finalize_calltext(func, callstring, for_chat):
-    source = _strip_our_decorators(digsource(func))
+def _finalize_calltext(
+    func, callstring, for_chat, source=None, structured=False
+):
+    if source is None:
+        source = artifacts(func).stripped_source
     if for_chat is True:
-        prefix = IEXEC_CHAT + CHATGPT_FORMAT + CHATGPT_NO + "\n###\n"
+        formatting = JSON_FORMAT if structured is True else CHATGPT_FORMAT
+        prefix = IEXEC_CHAT + formatting + CHATGPT_NO + "\n###\n"
         prompt = f"{prefix}\n{source}\n{callstring}\n"
     else:
         prefix = "# result of the function call\n>>> "
@@ -200,21 +254,112 @@ def _finalize_calltext(func, callstring, for_chat):
     return prompt
 
 
-def command_from_call(
+def command_prompt(
     _func: FunctionType, *args, _settings: Mapping = DEFAULT_SETTINGS, **kwargs
-):
-    prompt = argformat_docstring(_func, *args, **kwargs)
-    ftype = format_type(get_annotations(_func).get("return"))
+) -> tuple[str, bool]:
+    parts = artifacts(_func)
+    prompt = parts.docstring.format(**getcallargs(_func, *args, **kwargs))
+    ftype = parts.return_type
     no_parse = True
-    if ftype not in ("str", "None"):
+    if "response_format" in _settings:
+        no_parse = False
+        prompt += f"\n{JSON_FORMAT}its type is {ftype}."
+    elif ftype not in ("str", "None"):
         no_parse = False
         prompt += f"\nformat your response as a Python object of type {ftype}."
     if _settings.get("noexplain") is not False:
         prompt += "\nDo not write explanations."
+    return prompt, no_parse
+
+
+def command_from_call(
+    _func: FunctionType, *args, _settings: Mapping = DEFAULT_SETTINGS, **kwargs
+):
+    prompt, no_parse = command_prompt(
+        _func, *args, _settings=_settings, **kwargs
+    )
     response, _ = complete(prompt, _settings)
     return response, prompt, no_parse
 
 
+def _resolve_csource(_csource: CallSource) -> Optional[str]:
+    if not callable(_csource):
+        return _csource
+    try:
+        with span("call_source"):
+            return _csource()
+    # TODO: maybe log this somewhere, but it's fundamentally a fuzzy
+    #  heuristic catch step, so...
+    except (ValueError, SyntaxError):
+        return None
+
+
+def plan_wish_prompt(
+    _func: FunctionType,
+    callstring: str,
+    _csource: CallSource = None,
+    _settings: Mapping = DEFAULT_SETTINGS,
+) -> dict[str, Any]:
+    """
+    decide how to represent a function and its call in a wish prompt. in
+    order of preference: the function's full source or just its definition
+    (signature and docstring), with either the formatted call or the call
+    as written at its call site (_csource, which may be a function that
+    finds it, called only if needed). the first representation whose
+    whole prompt fits in the model's context along with max_tokens of
+    response is chosen. returns the decision (see tokens.plan_prompt).
+    """
+    for_chat = _settings["model"] in CHAT_MODELS
+    structured = "response_format" in _settings
+    sources = {}
+
+    def source_text(kind):
+        if kind not in sources:
+            if kind == "source":
+                sources[kind] = artifacts(_func).stripped_source
+            else:
+                sources[kind] = artifacts(_func).definition
+        return sources[kind]
+
+    calls = {"call": lambda: callstring}
+    if _csource is not None:
+        calls["csource"] = lambda: _resolve_csource(_csource)
+    candidates = []
+
+    def make_prompt(source_kind, call_kind):
+        if (call := calls[call_kind]()) is None:
+            return None
+        source = source_text(source_kind)
+        return _finalize_calltext(_func, call, for_chat, source, structured)
+
+    for source_kind in ("source", "definition"):
+        for call_kind in calls.keys():
+            candidates.append(
+                (
+                    {"source": source_kind, "call": call_kind},
+                    partial(make_prompt, source_kind, call_kind)
+                )
+            )
+    return plan_prompt(candidates, _settings)
+
+
+def wish_prompt(
+    _func: FunctionType,
+    *args,
+    _settings=DEFAULT_SETTINGS,
+    _csource=None,
+    _plans: Optional[list] = None,
+    **kwargs,
+) -> str:
+    callstring = format_calltext(
+        _func, *args, _budget=_settings.get("arg_budget", ARG_BUDGET), **kwargs
+    )
+    plan = plan_wish_prompt(_func, callstring, _csource, _settings)
+    if _plans is not None:
+        _plans.append(plan)
+    return plan["prompt"]
+
+
 def wish_for_call(
     _func: FunctionType,
     *args,
@@ -222,14 +367,9 @@ def wish_for_call(
     _csource=None,
     **kwargs,
 ):
-    for_chat = _settings["model"] in CHAT_MODELS
-    callstring = format_calltext(_func, *args, **kwargs)
-    if _csource is not None:
-        # TODO: dumb magic number, misses lots of context, etc., etc.
-        tokens = encoding_for_model(_settings['model']).encode(callstring)
-        if len(tokens) > _settings['max_tokens'] * 0.8:
-            callstring = _csource
-    prompt = _finalize_calltext(_func, callstring, for_chat)
+    prompt = wish_prompt(
+        _func, *args, _settings=_settings, _csource=_csource, **kwargs
+    )
     return complete(prompt, _settings)
 
 
@@ -260,37 +400,117 @@ def literalizer(text: str, retry: bool = False):
     raise exception
 
 
+def parse_response(text: str):
+    """
+    parse the value in (stripped) response text with a single scan (see
+    antiscope.extract). falls back to literalizer if that finds nothing.
+    """
+    try:
+        return extract_literal(text)
+    except ExtractionError:
+        return literalizer(text)
+
+
 EVOCATION_PIPELINE = MappingProxyType(
+    {"choose": getchoice, "strip": extract_code, "parse": parse_response}
+)
+# the pipeline used before antiscope.extract (see benchmarks/bench_extract.py)
+LITERALIZER_PIPELINE = MappingProxyType(
     {"choose": getchoice, "strip": strip_codeblock, "parse": literalizer}
 )
 
 
-# TODO: this might be usable in part as a more generic evoke pattern.
-def evoke(
+def structured_settings(
+    _func: FunctionType,
+    _settings: Mapping = DEFAULT_SETTINGS,
+    _performativity: Literal[Performative] = "wish",
+) -> Optional[dict]:
+    """
+    if _settings ask for structured output and it's possible here, return
+    them with a response_format constraining the response to a JSON
+    encoding of _func's return type. otherwise return None.
+    """
+    if (_settings.get("structured") is not True) or not (
+        supports_json_schema(_settings["model"])
+    ):
+        return None
+    annotation = artifacts(_func).annotations.get("return", Any)
+    # commands with string results are used verbatim
+    if (_performativity == "command") and (annotation in (str, None, Any)):
+        return None
+    try:
+        fmt = response_format(annotation, _func.__name__)
+    except SchemaError:
+        return None
+    return dict(_settings) | {"response_format": fmt}
+
+
+def structured_pipeline(_func: FunctionType) -> Mapping[str, Callable]:
+    """processing pipeline for structured responses: just decode them"""
+    annotation = artifacts(_func).annotations.get("return", Any)
+
+    def decode_structured(text: str):
+        return decode(text, annotation)
+
+    return MappingProxyType(
+        {"choose": getchoice, "parse": decode_structured}
+    )
+
+
+def _structure(_func, _settings, _performativity, _processing_pipeline):
+    """settings and pipeline for an evocation, with structured output"""
+    structured = structured_settings(_func, _settings, _performativity)
+    if structured is None:
+        return _settings, _processing_pipeline
+    if _processing_pipeline is EVOCATION_PIPELINE:
+        _processing_pipeline = structured_pipeline(_func)
+    return structured, _processing_pipeline
+
+
+def evocation_prompt(
     _func: FunctionType,
     *args,
     _settings: Mapping = DEFAULT_SETTINGS,
     _performativity: Literal[Performative] = "wish",
+    _csource: CallSource = None,
+    _plans: Optional[list] = None,
+    **kwargs,
+) -> tuple[str, bool]:
+    """
+    construct the prompt for an evocation. returns the prompt and a flag
+    indicating whether the response should skip the parse step. if _plans
+    is a list, prompt budget decisions are appended to it.
+    """
+    if _performativity == "wish":
+        with span("prompt"):
+            prompt = wish_prompt(
+                _func,
+                *args,
+                _settings=_settings,
+                _csource=_csource,
+                _plans=_plans,
+                **kwargs,
+            )
+        return prompt, False
+    if _performativity == "command":
+        with span("prompt"):
+            return command_prompt(
+                _func, *args, _settings=_settings, **kwargs
+            )
+    raise ValueError(
+        f"This function only accepts 'wish' and 'command' performatives "
+        f"(received {_performativity})"
+    )
+
+
+def process_evocation(
+    response,
+    prompt,
+    no_parse: bool = False,
     _extended: bool = False,
     _processing_pipeline: Mapping[str, Callable] = EVOCATION_PIPELINE,
-    _csource: Optional[str] = None,
-    **kwargs,
 ):
-    """evoke a function, producing a possible result of its execution"""
-    no_parse = False
-    if _performativity == "wish":
-        response, prompt = wish_for_call(
-            _func, *args, _settings=_settings, _csource=_csource, **kwargs
-        )
-    elif _performativity == "command":
-        response, prompt, no_parse = command_from_call(
-            _func, *args, _settings=_settings, **kwargs
-        )
-    else:
-        raise ValueError(
-            f"This function only accepts 'wish' and 'command' performatives "
-            f"(received {_performativity})"
-        )
+    """run an evocation response through the processing pipeline"""
     exception, excstep, report = None, None, None
     result = response
     for name, step in _processing_pipeline.items():
@@ -299,7 +519,8 @@ def evoke(
             # response as a string
             continue
         try:
-            result = step(result)
+            with span(f"pipeline.{name}"):
+                result = step(result)
         except KeyboardInterrupt:
             raise
         except Exception as exc:
@@ -312,6 +533,145 @@ def evoke(
     return result, response, prompt, report, exception
 
 
+# TODO: this might be usable in part as a more generic evoke pattern.
+def evoke(
+    _func: FunctionType,
+    *args,
+    _settings: Mapping = DEFAULT_SETTINGS,
+    _performativity: Literal[Performative] = "wish",
+    _extended: bool = False,
+    _processing_pipeline: Mapping[str, Callable] = EVOCATION_PIPELINE,
+    _csource: CallSource = None,
+    _plans: Optional[list] = None,
+    **kwargs,
+):
+    """evoke a function, producing a possible result of its execution"""
+    with span("evoke", _func.__name__):
+        _settings, _processing_pipeline = _structure(
+            _func, _settings, _performativity, _processing_pipeline
+        )
+        prompt, no_parse = evocation_prompt(
+            _func,
+            *args,
+            _settings=_settings,
+            _performativity=_performativity,
+            _csource=_csource,
+            _plans=_plans,
+            **kwargs,
+        )
+        with span("api"):
+            response, _ = complete(prompt, _settings)
+        return process_evocation(
+            response, prompt, no_parse, _extended, _processing_pipeline
+        )
+
+
+async def aevoke(
+    _func: FunctionType,
+    *args,
+    _settings: Mapping = DEFAULT_SETTINGS,
+    _performativity: Literal[Performative] = "wish",
+    _extended: bool = False,
+    _processing_pipeline: Mapping[str, Callable] = EVOCATION_PIPELINE,
+    _csource: CallSource = None,
+    _plans: Optional[list] = None,
+    **kwargs,
+):
+    """
+    async version of evoke(). prompt construction and response processing
+    run in worker threads to keep them off the event loop.
+    """
+    with span("evoke", _func.__name__):
+        _settings, _processing_pipeline = _structure(
+            _func, _settings, _performativity, _processing_pipeline
+        )
+        prompt, no_parse = await to_thread(
+            evocation_prompt,
+            _func,
+            *args,
+            _settings=_settings,
+            _performativity=_performativity,
+            _csource=_csource,
+            _plans=_plans,
+            **kwargs,
+        )
+        with span("api"):
+            response, _ = await acomplete(prompt, _settings)
+        return await to_thread(
+            process_evocation,
+            response,
+            prompt,
+            no_parse,
+            _extended,
+            _processing_pipeline,
+        )
+
+
+def stream_evocation(
+    stream: Iterable[str],
+    no_parse: bool = False,
+    errors: Optional[list] = None,
+) -> Iterator:
+    """
+    yield the elements of the sequence literal in a streamed evocation
+    response as soon as each one is complete. if the response turns out
+    not to contain a sequence, it is parsed as a whole once the stream
+    ends, and its elements (or the whole object, if it isn't a sequence)
+    are yielded then. if no_parse is True, yields raw text as it arrives.
+
+    elements that fail to parse raise an exception, unless an errors list
+    is given, in which case they are logged to it and yielded as text.
+    """
+    if no_parse is True:
+        yield from stream
+        return
+    parser, chunks = SequenceStreamParser(), []
+
+    def parse(element):
+        try:
+            return ast.literal_eval(element)
+        except (SyntaxError, ValueError) as exc:
+            if errors is None:
+                raise
+            errors.append(exc_report(exc) | {"step": "parse"})
+            return element
+
+    for chunk in stream:
+        chunks.append(chunk)
+        yield from map(parse, parser.feed(chunk))
+    yield from map(parse, parser.close())
+    if parser.found is True:
+        return
+    result = parse_response(extract_code("".join(chunks)))
+    if isinstance(result, (list, tuple)):
+        yield from result
+    else:
+        yield result
+
+
+def evoke_stream(
+    _func: FunctionType,
+    *args,
+    _settings: Mapping = DEFAULT_SETTINGS,
+    _performativity: Literal[Performative] = "wish",
+    _csource: CallSource = None,
+    **kwargs,
+) -> Iterator:
+    """
+    evoke a function with a streamed API call, yielding elements of the
+    sequence it (possibly) returns as they are generated
+    """
+    prompt, no_parse = evocation_prompt(
+        _func,
+        *args,
+        _settings=_settings,
+        _performativity=_performativity,
+        _csource=_csource,
+        **kwargs,
+    )
+    return stream_evocation(complete_stream(prompt, _settings), no_parse)
+
+
 def imply(
     base: Union[str, FunctionType],
     *,
@@ -327,59 +687,183 @@ def imply(
         return_like=return_like,
         _settings=_settings | api_kwargs,
     )
-    return Dynamic(reconstruct_def(result, base), globals_=globals())
+    return first_loadable(reconstruct_defs(result, base))
+
+
+async def aimply(
+    base: Union[str, FunctionType],
+    *,
+    args_like: Any = None,
+    return_like: Any = None,
+    _settings: Mapping = DEFAULT_SETTINGS,
+    **api_kwargs,
+):
+    """async version of imply()"""
+    result, prompt = await arequest_function_definition(
+        base,
+        args_like=args_like,
+        return_like=return_like,
+        _settings=_settings | api_kwargs,
+    )
+    return await to_thread(
+        lambda: first_loadable(reconstruct_defs(result, base))
+    )
+
+
+def first_loadable(sources: Sequence[str]) -> Dynamic:
+    """Dynamic from the first of sources that compiles and defines"""
+    for source in sources[:-1]:
+        dynamic = Dynamic(source, globals_=globals(), lazy=True)
+        try:
+            dynamic.load()
+        except KeyboardInterrupt:
+            raise
+        except Exception:
+            continue
+        if dynamic.compile_fail is False:
+            return dynamic
+    return Dynamic(sources[-1], globals_=globals())
 
 
 class OAIrrealis(Irrealis):
-    def imply(self, _sideload_settings: Optional[Mapping] = None) -> str:
-        step = "setup"
+    def _implication_request(
+        self, _sideload_settings: Optional[Mapping] = None
+    ) -> tuple[Any, dict]:
+        """base and request_function_definition() kwargs for an implication"""
         _settings = self.api_settings
         if _sideload_settings is not None:
             _settings = _settings | _sideload_settings
+        request = {
+            "_settings": _settings, "performativity": self.performativity
+        }
+        # TODO: what is going on with the typing here?
+        if isinstance(self.description, Mapping):
+            return self.description["base"], request | dict(self.description)
+        return self.description, request | {"base": self.description}
+
+    def _implication_failure(self, exc, step) -> ImplicationFailure:
+        self.errors.append(
+            exc_report(exc) | {"category": "imply", "step": step}
+        )
+        return ImplicationFailure(exc)
+
+    def imply(self, _sideload_settings: Optional[Mapping] = None) -> str:
+        step = "setup"
         try:
-            step = "api_call"
-            # TODO: what is going on with the typing here?
-            if isinstance(self.description, Mapping):
-                base = self.description["base"]
-                res, prompt = request_function_definition(
-                    _settings=_settings,
-                    performativity=self.performativity,
-                    **self.description
-                )
-            else:
-                base = self.description
-                res, prompt = request_function_definition(
-                    self.description,
-                    _settings=_settings,
-                    performativity=self.performativity,
-                )
-            self._record_event(prompt, res, "imply")
-            step = "extract_response"
-            return reconstruct_def(res, base)
+            base, request = self._implication_request(_sideload_settings)
+            examples, options = self._validation_options(request)
+            for attempt in range(_attempts(examples, options)):
+                step = "api_call"
+                _uncache_retry(request, attempt)
+                with span("imply", _defname(base)):
+                    res, prompt = request_function_definition(**request)
+                self._record_event(prompt, res, "imply")
+                step = "extract_response"
+                sources = reconstruct_defs(res, base)
+                step = "validate"
+                with span("validate", _defname(base)):
+                    sources = self._validated(
+                        sources, base, examples, options
+                    )
+                if sources:
+                    return self._take_candidates(sources)
+            raise ValidationError("no implied candidate passed validation")
+        except KeyboardInterrupt:
+            raise
+        except Exception as exc:
+            raise self._implication_failure(exc, step)
+
+    async def aimply(
+        self, _sideload_settings: Optional[Mapping] = None
+    ) -> str:
+        step = "setup"
+        try:
+            base, request = self._implication_request(_sideload_settings)
+            examples, options = self._validation_options(request)
+            for attempt in range(_attempts(examples, options)):
+                step = "api_call"
+                _uncache_retry(request, attempt)
+                with span("imply", _defname(base)):
+                    res, prompt = await arequest_function_definition(
+                        **request
+                    )
+                self._record_event(prompt, res, "imply")
+                step = "extract_response"
+                sources = await to_thread(reconstruct_defs, res, base)
+                step = "validate"
+                with span("validate", _defname(base)):
+                    sources = await to_thread(
+                        self._validated, sources, base, examples, options
+                    )
+                if sources:
+                    return self._take_candidates(sources)
+            raise ValidationError("no implied candidate passed validation")
         except KeyboardInterrupt:
             raise
         except Exception as exc:
+            raise self._implication_failure(exc, step)
+
+    @staticmethod
+    def _validation_options(request: Mapping) -> tuple[Optional[list], dict]:
+        """examples and options for validating implied candidates, if on"""
+        if (spec := request["_settings"].get("validate")) in (None, False):
+            return None, {}
+        examples = validation_examples(
+            request.get("args_like"), request.get("return_like")
+        )
+        return examples, dict(spec) if isinstance(spec, Mapping) else {}
+
+    def _validated(self, sources, base, examples, options) -> list[str]:
+        """the sources that pass validation against examples, if any"""
+        if examples is None:
+            return sources
+        reports = validate(
+            sources,
+            examples,
+            _defname(base),
+            options.get("timeout", VALIDATION_TIMEOUT),
+            options.get("memory", VALIDATION_MEMORY),
+        )
+        if any(r["unusable"] for r in reports):
+            # not the candidates' fault: don't pay to imply them again
             self.errors.append(
-                exc_report(exc) | {"category": "imply", "step": step}
+                exc_report(ValidationError(reports[0]["error"]))
+                | {"category": "validate", "skipped": True}
             )
-            raise ImplicationFailure(exc)
+            return sources
+        for report in filter(lambda r: not r["passed"], reports):
+            self.errors.append(
+                exc_report(ValidationError(report["error"]))
+                | {"category": "validate", "source": report["source"]}
+            )
+        return [r["source"] for r in reports if r["passed"]]
 
-    def evoke(self, *args, _optional=None, **kwargs):
-        if _optional is None:
-            if "dry_run" in self.api_settings:
-                _optional = True
-            else:
-                _optional = self.optional
-        result, res, prompt, report, exc = evoke(
-            self.func,
-            *args,
-            _extended=True,
-            _performativity=self.performativity,
-            _settings=self.api_settings,
-            _csource=self.csource,
-            **kwargs,
-        )
-        self._record_event(prompt, res, "evoke")
+    def _take_candidates(self, sources: list[str]) -> str:
+        """use the first source; keep the others for fallback"""
+        self.candidates = sources[1:]
+        return sources[0]
+
+    def _evocation_settings(self) -> dict:
+        return {
+            "_extended": True,
+            "_performativity": self.performativity,
+            "_settings": self.api_settings,
+            "_csource": self.csource,
+            # receives prompt budget decisions
+            "_plans": [],
+        }
+
+    def _resolve_optional(self, _optional=None) -> bool:
+        if _optional is not None:
+            return _optional
+        if "dry_run" in self.api_settings:
+            return True
+        return self.optional
+
+    def _settle_evocation(self, outcome, _optional=None, plans=()):
+        _optional = self._resolve_optional(_optional)
+        result, res, prompt, report, exc = outcome
+        self._record_event(prompt, res, "evoke", plans)
         if exc is not None:
             self.evoke_fail = True
             self.errors.append(report)
@@ -391,6 +875,119 @@ class OAIrrealis(Irrealis):
             raise EvocationFailure(exc)
         return result
 
+    def evoke(self, *args, _optional=None, **kwargs):
+        if self.api_settings.get("stream") is True:
+            return self._stream(*args, _optional=_optional, **kwargs)
+        settings = self._evocation_settings()
+        outcome = evoke(self.func, *args, **settings, **kwargs)
+        return self._settle_evocation(outcome, _optional, settings["_plans"])
+
+    async def aevoke(self, *args, _optional=None, **kwargs):
+        settings = self._evocation_settings()
+        outcome = await aevoke(self.func, *args, **settings, **kwargs)
+        return self._settle_evocation(outcome, _optional, settings["_plans"])
+
+    def stream(self, *args, _optional=None, **kwargs) -> Iterator:
+        """
+        evoke this function with a streamed API call, yielding elements of
+        the sequence it returns as soon as each one is generated. (objects
+        created with stream=True do this whenever they are called.)
+        """
+        reload = (self.stance == "implicit") and self.auto_reimply
+        self._maybe_load_on_call(reload=reload)
+        return self._stream(*args, _optional=_optional, **kwargs)
+
+    def _stream(self, *args, _optional=None, **kwargs) -> Iterator:
+        _optional, plans = self._resolve_optional(_optional), []
+        prompt, no_parse = evocation_prompt(
+            self.func,
+            *args,
+            _settings=self.api_settings,
+            _performativity=self.performativity,
+            _csource=self.csource,
+            _plans=plans,
+            **kwargs,
+        )
+        stream = complete_stream(prompt, self.api_settings)
+        return self._iter_stream(stream, prompt, no_parse, _optional, plans)
+
+    def _iter_stream(self, stream, prompt, no_parse, _optional, plans=()):
+        errors = self.errors if _optional is True else None
+        try:
+            yield from stream_evocation(stream, no_parse, errors)
+        except KeyboardInterrupt:
+            raise
+        except Exception as exc:
+            self.evoke_fail = True
+            self.errors.append(exc_report(exc) | {"step": "stream"})
+            if _optional is False:
+                raise EvocationFailure(exc)
+        finally:
+            self._record_event(prompt, stream.response, "evoke", plans)
+
+    def _map_one(self, args: tuple, _optional=None):
+        if self.side == "invocative":
+            return self.invoke(*args, _optional=_optional)
+        # call sites captured by __call__ don't describe these calls
+        settings = self._evocation_settings() | {"_csource": None}
+        outcome = evoke(self.func, *args, **settings)
+        return self._settle_evocation(outcome, _optional, settings["_plans"])
+
+    def map(
+        self,
+        iterable: Iterable,
+        max_workers: int = 8,
+        ordered: bool = True,
+        _optional: Optional[bool] = None,
+    ) -> Iterator:
+        """
+        call this function on every element of iterable, concurrently, in
+        a pool of max_workers threads. tuple elements are unpacked as
+        positional arguments; anything else is passed as a single argument.
+        calls with identical arguments (as formatted by format_calltext)
+        are made only once.
+
+        if ordered is True, yields results in input order; otherwise, yields
+        (index, result) pairs as soon as each result is ready. failed calls
+        follow the usual _optional semantics: if optional, they are logged
+        to self.errors and yield a fallback value; if not, their exception
+        is raised when the iterator reaches them.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        reload = (self.stance == "implicit") and self.auto_reimply
+        self._maybe_load_on_call(reload=reload)
+        argtuples = [a if isinstance(a, tuple) else (a,) for a in iterable]
+        keys, first = [], {}
+        for i, args in enumerate(argtuples):
+            try:
+                key = format_calltext(self.func, *args)
+            except TypeError:
+                # ugly reprs; no way to recognize duplicates
+                key = i
+            keys.append(key)
+            first.setdefault(key, i)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                key: executor.submit(self._map_one, argtuples[i], _optional)
+                for key, i in first.items()
+            }
+            if ordered is True:
+                for key in keys:
+                    yield futures[key].result()
+                return
+            indices = {}
+            for i, key in enumerate(keys):
+                indices.setdefault(key, []).append(i)
+            keyed = {future: key for key, future in futures.items()}
+            for future in as_completed(keyed):
+                result = future.result()
+                for i in indices[keyed[future]]:
+                    yield i, result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def tochat(self) -> list[dict]:
         # TODO: deal with system?
         messages = []
@@ -405,23 +1002,31 @@ class OAIrrealis(Irrealis):
 
     @property
     def usage(self):
-        return get_usage(self.history)
+        return self.history.usage
 
     @property
     def cost(self):
-        return get_cost(self.api_settings["model"], self.history)
+        return self.history.cost
 
-    def _record_event(self, prompt, response, category):
-        self.history.append(_eventrecord(prompt, response, category))
+    def _record_event(self, prompt, response, category, plans=()):
+        self.history.record(
+            category,
+            prompt,
+            response,
+            model=self.api_settings["model"],
+            # prompt token budget decision (see plan_wish_prompt), without
+            # its copy of the prompt
+            plan=keyfilter(lambda k: k != "prompt", plans[-1])
+            if plans else None,
+        )
 
     def __call__(self, *args, _optional=None, **kwargs):
+        if (_optional is None) and ((fast := self._fast) is not None):
+            return fast(*args, **kwargs)
         if self.side == "evocative":
-            try:
-                self.csource = capture_call()
-            # TODO: maybe log this somewhere, but it's fundamentally a fuzzy
-            #  heuristic catch step, so...
-            except (ValueError, SyntaxError):
-                pass
+            # only parsed if the prompt planner needs it
+            with span("capture_call", self.__name__):
+                self.csource = capture_call(lazy=True)
         return super().__call__(*args, _optional=_optional, **kwargs)
 
     performativity: Performative = "wish"
@@ -429,18 +1034,32 @@ class OAIrrealis(Irrealis):
     csource = None
 
 
+def _attempts(examples: Optional[list], options: Mapping) -> int:
+    """how many implication requests to make until a candidate validates"""
+    return 1 if examples is None else 1 + options.get("retries", 1)
+
+
+def _uncache_retry(request: dict, attempt: int):
+    # a cached response would just fail validation again
+    if attempt > 0:
+        request["_settings"] = request["_settings"] | {"cache": False}
+
+
+def _defname(defstem) -> Optional[str]:
+    if "__name__" in dir(defstem):
+        return defstem.__name__
+    if isinstance(defstem, str):
+        if (match := re.search(r"def (.+)\(", defstem)) is not None:
+            return match.group(1)
+    return None
+
+
 def reconstruct_def(response, defstem, choice_ix=0, raise_truncated=True):
+    fname = _defname(defstem)
     if "__name__" in dir(defstem):
         # functions and things like functions
-        fname = defstem.__name__
-        defstem = getdef(defstem)
-    else:
-        # just strings
-        if (match := re.search(r"def (.+)\(", defstem)) is not None:
-            fname = match.group(1)
-        else:
-            fname = None
-    received = strip_codeblock(
+        defstem = artifacts(defstem).definition
+    received = extract_code(
         getchoice(response, choice_ix, raise_truncated), fname
     )
     if received.startswith("def"):
@@ -453,13 +1072,35 @@ def reconstruct_def(response, defstem, choice_ix=0, raise_truncated=True):
     return f"{defstem}\n{received}"
 
 
-def request_object_construction(
+def reconstruct_defs(response, defstem, raise_truncated=True) -> list[str]:
+    """
+    reconstruct_def() for every choice in response, skipping choices that
+    fail (unless all of them do) and duplicates
+    """
+    sources, exception = [], None
+    for choice_ix in range(len(response.choices)):
+        try:
+            sources.append(
+                reconstruct_def(response, defstem, choice_ix, raise_truncated)
+            )
+        except KeyboardInterrupt:
+            raise
+        except Exception as exc:
+            exception = exception if exception is not None else exc
+    if exception is not None and not sources:
+        raise exception
+    if not sources:
+        raise ValueError("response has no choices")
+    return list(dict.fromkeys(sources))
+
+
+def object_construction_prompt(
     base: Union[str, Mapping, None] = None,
     implied_type: Union[None, type, _GenericAlias] = None,
     *,
     language: str = "Python",
     _settings: Mapping = DEFAULT_SETTINGS,
-):
+) -> str:
     if _settings.get("model") not in CHAT_MODELS:
         raise NotImplementedError(
             "Base (non-chat) completions not yet implemented for "
@@ -470,10 +1111,35 @@ def request_object_construction(
             "Mapping expansion not yet implemented for the `base` "
             "argument of request_object_construction."
         )
-    prompt = format_construction_prompt(base, implied_type, language)
+    return format_construction_prompt(base, implied_type, language)
+
+
+def request_object_construction(
+    base: Union[str, Mapping, None] = None,
+    implied_type: Union[None, type, _GenericAlias] = None,
+    *,
+    language: str = "Python",
+    _settings: Mapping = DEFAULT_SETTINGS,
+):
+    prompt = object_construction_prompt(
+        base, implied_type, language=language, _settings=_settings
+    )
     return complete(prompt, _settings)
 
 
+async def arequest_object_construction(
+    base: Union[str, Mapping, None] = None,
+    implied_type: Union[None, type, _GenericAlias] = None,
+    *,
+    language: str = "Python",
+    _settings: Mapping = DEFAULT_SETTINGS,
+):
+    prompt = object_construction_prompt(
+        base, implied_type, language=language, _settings=_settings
+    )
+    return await acomplete(prompt, _settings)
+
+
 def format_construction_prompt(base, implied_type, language="Python"):
     prompt = f"Show me example {language} code that constructs an object "
     if implied_type is not None:
@@ -496,7 +1162,29 @@ class OAImplication(Implication):
             )
             self._record_event(prompt, res, "imply")
             step = "extract_response"
-            return strip_codeblock(getchoice(res))
+            return extract_code(getchoice(res))
+        except KeyboardInterrupt:
+            raise
+        except Exception as exc:
+            self.errors.append(
+                exc_report(exc) | {"category": "imply", "step": step}
+            )
+            raise ImplicationFailure(exc)
+
+    async def aimply(self) -> str:
+        step = "setup"
+        try:
+            step = "api_call"
+            res, prompt = await arequest_object_construction(
+                self.description,
+                self.implied_type,
+                _settings=self.api_settings,
+            )
+            self._record_event(prompt, res, "imply")
+            step = "extract_response"
+            return await to_thread(
+                lambda: extract_code(getchoice(res))
+            )
         except KeyboardInterrupt:
             raise
         except Exception as exc:
@@ -506,19 +1194,21 @@ class OAImplication(Implication):
             raise ImplicationFailure(exc)
 
     def _record_event(self, prompt, response, category):
-        self.history.append(_eventrecord(prompt, response, category))
+        self.history.record(
+            category, prompt, response, model=self.api_settings["model"]
+        )
 
     @property
     def usage(self):
-        return get_usage(self.history)
+        return self.history.usage
 
     @property
     def cost(self):
-        return get_cost(self.api_settings["model"], self.history)
+        return self.history.cost
 
     @staticmethod
     def literalize(text):
-        return literalizer(text)
+        return parse_response(text)
 
     default_api_settings = DEFAULT_SETTINGS
 
@@ -0,0 +1,249 @@
+"""
+single-pass extraction of code and literal values from model responses.
+
+extract_code() finds the fenced code in a response (and optionally the
+start of a target def) with a handful of linear searches. scan() splits
+code into top-level statements in one pass, tracking brackets, strings and
+comments, and notes whether the code was cut off inside a literal.
+extract() then tries only the statements that could hold the result, last
+first, and repairs trivially truncated literals locally: it closes
+unclosed brackets, or drops an element cut off inside a string.
+"""
+import ast
+import dis
+import re
+from typing import Any, Optional
+
+FENCE = "```"
+# text that marks a line as not being the result we're looking for
+SKIP_PREFIXES = (
+    FENCE, ">>>", "...", "#", "print(", "def ", "import ", "from ", "@"
+)
+ASSIGNMENT = re.compile(r"([A-Za-z_][\w.]*)\s*(?::[^=\n]*)?=(?!=)\s*")
+CLOSERS = {"(": ")", "[": "]", "{": "}"}
+# what a bare (non-code) response might wrap a value in
+FALLBACK_STRIPPABLES = "".join(('"', "'", "`", "\n", " ", "."))
+
+
+# bytecode that an expression building a literal value can compile to
+LITERAL_OPCODES = frozenset(
+    dis.opmap[name] for name in (
+        "CACHE", "NOP", "RESUME", "EXTENDED_ARG", "LOAD_CONST",
+        "RETURN_VALUE", "RETURN_CONST", "UNARY_NEGATIVE",
+        "BUILD_TUPLE", "BUILD_LIST", "BUILD_SET", "BUILD_MAP",
+        "BUILD_CONST_KEY_MAP", "LIST_APPEND", "LIST_EXTEND", "SET_ADD",
+        "SET_UPDATE", "MAP_ADD", "DICT_UPDATE",
+    )
+    if name in dis.opmap
+)
+
+
+# what parsing a non-literal (or an enormous one) may raise
+LITERAL_ERRORS = (
+    SyntaxError, ValueError, TypeError, MemoryError, RecursionError
+)
+
+
+class ExtractionError(ValueError):
+    pass
+
+
+def literal_value(expression: str) -> Any:
+    """
+    ast.literal_eval(), but faster on large literals: the expression is
+    compiled, and evaluated only if its bytecode does nothing but load
+    constants and build containers (so constant-folded arithmetic like
+    2 * 3 is also accepted). anything else goes to ast.literal_eval.
+    """
+    code = compile(expression.lstrip(" \t"), "<literal>", "eval")
+    if code.co_names or not LITERAL_OPCODES.issuperset(code.co_code[::2]):
+        return ast.literal_eval(expression)
+    return eval(code, {"__builtins__": {}})
+
+
+def extract_code(text: str, fname: Optional[str] = None) -> str:
+    """
+    the code in a response: the content of its code fence(s) if any,
+    starting from the definition of fname if it's given and present,
+    without leading / trailing fence or interpreter-prompt lines.
+    """
+    if (start := text.find(FENCE)) != -1:
+        start += len(FENCE)
+        newline = text.find("\n", start)
+        # skip a language tag
+        if (newline != -1) and text[start:newline].strip().isidentifier():
+            start = newline + 1
+        end = text.rfind(FENCE, start)
+        text = text[start:end if end != -1 else len(text)]
+    if fname is not None:
+        match = re.search(rf"^\s*def {re.escape(fname)}\b", text, re.M)
+        if match is not None:
+            text = text[match.start():].lstrip("\n")
+    lines = text.strip("\n").split("\n")
+    head = 0
+    while (head < min(len(lines), 2)) and _codestrippable(lines[head]):
+        head += 1
+    tail = len(lines)
+    if (tail > head) and _codestrippable(lines[tail - 1]):
+        tail -= 1
+    return "\n".join(lines[head:tail])
+
+
+def _codestrippable(line: str) -> bool:
+    return line.startswith((FENCE, ">>>"))
+
+
+# characters the scanner has to look at; everything else is skipped over
+SCAN_EVENTS = re.compile(r"""['"#()\[\]{}\n]""")
+SCAN_EVENTS_COMMAS = re.compile(r"""['"#()\[\]{}\n,]""")
+# the rest of a string after its opening quote, up to and including the
+# closing quote (or, for single-quoted strings, the end of the line)
+STRING_ENDS = {
+    "'": re.compile(r"(?:[^'\\\n]|\\.)*('|\n|\Z)", re.S),
+    '"': re.compile(r'(?:[^"\\\n]|\\.)*("|\n|\Z)', re.S),
+    "'''": re.compile(r"(?:[^\\]|\\.)*?('''|\Z)", re.S),
+    '"""': re.compile(r'(?:[^\\]|\\.)*?("""|\Z)', re.S),
+}
+
+
+def scan(code: str, start: int = 0, commas: bool = False) -> dict[str, Any]:
+    """
+    split code[start:] into top-level logical lines in one pass. returns a
+    dict with the (start, end) spans of the statements, any brackets left
+    open at the end of the text as [bracket, position, last comma position]
+    lists (comma positions are only tracked if commas is True), and the
+    quote and position of an unterminated string.
+    """
+    events = SCAN_EVENTS_COMMAS if commas is True else SCAN_EVENTS
+    statements, stack = [], []
+    quote, quote_start = None, None
+    i, n, stmt_start = start, len(code), start
+    while (match := events.search(code, i)) is not None:
+        i, char = match.start(), match.group()
+        if char in "'\"":
+            triple = char * 3
+            quote = triple if code.startswith(triple, i) else char
+            quote_start = i
+            end = STRING_ENDS[quote].match(code, i + len(quote))
+            i = end.end()
+            if end.group(1) == quote:
+                quote = None
+            elif end.group(1) == "\n":
+                # single-quoted strings can't span lines; this was probably
+                # an apostrophe in prose. (look at the newline again.)
+                quote, i = None, i - 1
+            continue
+        if char == "#":
+            if (i := code.find("\n", i)) == -1:
+                break
+            continue
+        if char in CLOSERS:
+            stack.append([char, i, None])
+        elif char in ")]}":
+            if stack:
+                stack.pop()
+        elif char == ",":
+            if stack:
+                stack[-1][2] = i
+        elif not stack:
+            statements.append((stmt_start, i))
+            stmt_start = i + 1
+        i += 1
+    statements.append((stmt_start, n))
+    return {
+        "statements": statements,
+        "open": stack,
+        "quote": quote,
+        "quote_start": quote_start,
+    }
+
+
+def _split_target(statement: str) -> tuple[Optional[str], str]:
+    if (match := ASSIGNMENT.match(statement)) is None:
+        return None, statement
+    return match.group(1), statement[match.end():]
+
+
+def repair(code: str, start: int) -> list[str]:
+    """
+    candidate completions of code[start:], an expression cut off inside a
+    literal: close its open brackets as-is, then cut back to the last
+    complete element of the innermost open container. an element cut off
+    inside a string is always dropped, never closed as a shorter string.
+    """
+    scanned = scan(code, start, commas=True)
+    opened = scanned["open"]
+    if not opened and (scanned["quote"] is None):
+        return []
+    closers = "".join(CLOSERS[b[0]] for b in reversed(opened))
+    tail = code[start:]
+    candidates = []
+    if scanned["quote"] is None:
+        candidates.append(tail.rstrip().rstrip(",") + closers)
+    # drop a partial last element
+    for depth in range(len(opened) - 1, -1, -1):
+        if (comma := opened[depth][2]) is not None:
+            enclosing = reversed(opened[:depth + 1])
+            candidates.append(
+                code[start:comma] + "".join(CLOSERS[b[0]] for b in enclosing)
+            )
+            break
+    return candidates
+
+
+def extract(text: str, code: bool = True) -> dict[str, Any]:
+    """
+    find the value of the final literal expression in a response. returns
+    a dict with the value, the statement it came from, the assignment
+    target if the statement was an assignment, and whether the literal
+    had to be repaired. if code is True, the response is first passed
+    through extract_code(). raises ExtractionError if no literal is found.
+    """
+    if code is True:
+        text = extract_code(text)
+    # usually the code is a single (possibly assigned) literal: try that
+    # before scanning. the compiler bails out early on anything else
+    target, expression = _split_target(text.strip())
+    try:
+        return {
+            "value": literal_value(expression),
+            "statement": text.strip(),
+            "target": target,
+            "repaired": False,
+        }
+    except LITERAL_ERRORS:
+        pass
+    scanned = scan(text)
+    truncated = bool(scanned["open"]) or (scanned["quote"] is not None)
+    spans = scanned["statements"]
+    for ix in range(len(spans) - 1, -1, -1):
+        start, end = spans[ix]
+        statement = text[start:end].lstrip()
+        start += end - start - len(statement)
+        statement = statement.rstrip()
+        if (not statement) or statement.startswith(SKIP_PREFIXES):
+            continue
+        target, expression = _split_target(statement)
+        attempts = [(expression, False)]
+        if (stripped := expression.strip(FALLBACK_STRIPPABLES)) != expression:
+            attempts.append((stripped, False))
+        if truncated and (ix == len(spans) - 1):
+            offset = start + len(statement) - len(expression)
+            attempts += [(a, True) for a in repair(text, offset)]
+        for attempt, repaired in attempts:
+            try:
+                value = literal_value(attempt)
+            except LITERAL_ERRORS:
+                continue
+            return {
+                "value": value,
+                "statement": statement,
+                "target": target,
+                "repaired": repaired,
+            }
+    raise ExtractionError("no literal expression found in response")
+
+
+def extract_literal(text: str) -> Any:
+    """value of the final literal expression in text (see extract())"""
+    return extract(text, code=False)["value"]
@@ -0,0 +1,247 @@
+"""
+process-wide rate limiting and spend control for API requests.
+
+a Governor enforces per-model requests/minute and tokens/minute limits and
+an optional dollar budget per time window, and adapts the number of
+concurrent requests (additive increase, multiplicative decrease) when the
+provider answers with rate-limit errors. callers that would exceed a limit
+wait in a queue rather than failing.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Mapping, Optional
+
+from antiscope.openai_settings import PRICING
+from antiscope.tokens import count_prompt_tokens
+
+
+def _prefixed(table: Mapping[str, Any], model: str) -> Optional[Any]:
+    for prefix, value in table.items():
+        if model.startswith(prefix):
+            return value
+    return None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int):
+    if (price := _prefixed(PRICING, model)) is None:
+        return 0
+    # prices given in PRICING are per 1000 tokens
+    return (
+        prompt_tokens * price["prompt"]
+        + completion_tokens * price["completion"]
+    ) / 1000
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+class Governor:
+    """
+    limits: mapping from model name prefix to a dict that may contain
+        'rpm' (requests per minute) and 'tpm' (tokens per minute).
+    budget: maximum dollars to spend per budget_window seconds.
+    max_concurrency / min_concurrency: bounds on simultaneous requests.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Mapping[str, Mapping[str, int]]] = None,
+        budget: Optional[float] = None,
+        budget_window: float = 3600,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        max_retries: int = 6,
+        backoff: float = 1,
+    ):
+        self.limits = dict(limits) if limits is not None else {}
+        self.budget, self.budget_window = budget, budget_window
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(max_concurrency)
+        self.max_retries, self.backoff = max_retries, backoff
+        self.inflight, self.queue_depth = 0, 0
+        # per-model deques of [time, tokens] entries within the last minute
+        self.requests: dict[str, deque] = {}
+        # [time, dollars] entries within the budget window
+        self.spend = deque()
+        self.waits = {"count": 0, "total": 0.0, "max": 0.0}
+        self.rate_limited = 0
+        self._cond = threading.Condition()
+
+    def _prune(self, now: float):
+        for entries in self.requests.values():
+            while entries and (now - entries[0][0] > 60):
+                entries.popleft()
+        while self.spend and (now - self.spend[0][0] > self.budget_window):
+            self.spend.popleft()
+
+    def _try_acquire(
+        self, model: str, tokens: int, cost: float
+    ) -> tuple[Optional[dict], float]:
+        """
+        reserve capacity for a request if possible. returns (ticket, 0) on
+        success and (None, seconds until capacity might free up) otherwise.
+        """
+        now = time.time()
+        self._prune(now)
+        entries = self.requests.setdefault(model, deque())
+        waits = []
+        if self.inflight >= max(int(self.concurrency), 1):
+            waits.append(1)
+        limit = _prefixed(self.limits, model) or {}
+        if (rpm := limit.get("rpm")) and len(entries) >= rpm:
+            waits.append(60 - (now - entries[0][0]))
+        if (tpm := limit.get("tpm")) and entries:
+            # (a single request larger than the limit goes through alone)
+            if sum(e[1] for e in entries) + tokens > tpm:
+                waits.append(60 - (now - entries[0][0]))
+        if (self.budget is not None) and self.spend:
+            if sum(e[1] for e in self.spend) + cost > self.budget:
+                waits.append(
+                    self.budget_window - (now - self.spend[0][0])
+                )
+        if waits:
+            return None, max(min(waits), 0.01)
+        entry, spent = [now, tokens], [now, cost]
+        entries.append(entry)
+        self.spend.append(spent)
+        self.inflight += 1
+        return {"model": model, "entry": entry, "spent": spent}, 0
+
+    def _record_wait(self, waited: float):
+        self.waits["count"] += 1
+        self.waits["total"] += waited
+        self.waits["max"] = max(self.waits["max"], waited)
+
+    def acquire(self, model: str, tokens: int = 0, cost: float = 0) -> dict:
+        """block until a request of (estimated) size tokens may proceed"""
+        start = time.time()
+        with self._cond:
+            self.queue_depth += 1
+            try:
+                while True:
+                    ticket, wait = self._try_acquire(model, tokens, cost)
+                    if ticket is not None:
+                        break
+                    self._cond.wait(wait)
+            finally:
+                self.queue_depth -= 1
+            self._record_wait(time.time() - start)
+        return ticket
+
+    async def aacquire(
+        self, model: str, tokens: int = 0, cost: float = 0
+    ) -> dict:
+        """acquire() for coroutines: waits without blocking the event loop"""
+        import asyncio
+
+        start = time.time()
+        with self._cond:
+            self.queue_depth += 1
+        try:
+            while True:
+                with self._cond:
+                    ticket, wait = self._try_acquire(model, tokens, cost)
+                if ticket is not None:
+                    break
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            with self._cond:
+                self.queue_depth -= 1
+        with self._cond:
+            self._record_wait(time.time() - start)
+        return ticket
+
+    def release(
+        self, ticket: dict, usage: Any = None, rate_limited: bool = False
+    ):
+        """
+        return capacity reserved by acquire(). usage, if given, replaces the
+        pre-call estimates with the token counts the API reported.
+        """
+        with self._cond:
+            self.inflight -= 1
+            if usage is not None:
+                ptok, ctok = usage.prompt_tokens, usage.completion_tokens
+                ticket["entry"][1] = ptok + ctok
+                ticket["spent"][1] = estimate_cost(ticket["model"], ptok, ctok)
+            if rate_limited is True:
+                self.rate_limited += 1
+                self.concurrency = max(
+                    self.concurrency / 2, self.min_concurrency
+                )
+            else:
+                self.concurrency = min(
+                    self.concurrency + 1 / self.concurrency,
+                    self.max_concurrency
+                )
+            self._cond.notify_all()
+
+    def estimate(self, payload, kwargs) -> tuple[str, int, float]:
+        model = kwargs.get("model", "")
+        ptok = count_prompt_tokens(payload, model)
+        ctok = kwargs.get("max_tokens") or 0
+        return model, ptok + ctok, estimate_cost(model, ptok, ctok)
+
+    def call(self, payload: Any, kwargs: Mapping, request):
+        """
+        perform request() under this governor's limits, retrying with
+        exponential backoff on rate-limit errors.
+        """
+        model, tokens, cost = self.estimate(payload, kwargs)
+        for attempt in range(self.max_retries + 1):
+            ticket = self.acquire(model, tokens, cost)
+            try:
+                response = request()
+            except Exception as exc:
+                limited = is_rate_limit_error(exc)
+                self.release(ticket, rate_limited=limited)
+                if (limited is False) or (attempt == self.max_retries):
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            self.release(ticket, getattr(response, "usage", None))
+            return response
+
+    async def acall(self, payload: Any, kwargs: Mapping, arequest):
+        """async version of call()"""
+        import asyncio
+
+        model, tokens, cost = self.estimate(payload, kwargs)
+        for attempt in range(self.max_retries + 1):
+            ticket = await self.aacquire(model, tokens, cost)
+            try:
+                response = await arequest()
+            except Exception as exc:
+                limited = is_rate_limit_error(exc)
+                self.release(ticket, rate_limited=limited)
+                if (limited is False) or (attempt == self.max_retries):
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            self.release(ticket, getattr(response, "usage", None))
+            return response
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            now = time.time()
+            self._prune(now)
+            return {
+                "queue_depth": self.queue_depth,
+                "inflight": self.inflight,
+                "concurrency": self.concurrency,
+                "rate_limited": self.rate_limited,
+                "waits": self.waits | {
+                    "mean": self.waits["total"] / max(self.waits["count"], 1)
+                },
+                "spend": sum(e[1] for e in self.spend),
+                "models": {
+                    model: {
+                        "requests": len(entries),
+                        "tokens": sum(e[1] for e in entries),
+                    }
+                    for model, entries in self.requests.items()
+                },
+            }
@@ -0,0 +1,247 @@
+"""
+bounded records of API events, with running usage totals.
+
+a History keeps the most recent events in a ring buffer of compact Event
+records (responses reduced to the text, finish reasons and token counts
+that history consumers read) and, optionally, appends every event to a
+JSONL file, so that long-running processes keep a full log on disk
+without holding it in memory. it tallies tokens per model as events are
+recorded, so usage and cost are O(1), and correct when models are mixed.
+"""
+import datetime as dt
+import json
+import threading
+from collections import deque
+from collections.abc import Mapping
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional, Union
+
+from antiscope.governor import estimate_cost
+
+# events kept in memory per history
+HISTORY_SIZE = 1024
+# entries kept in memory per errors list
+ERRORS_SIZE = 256
+
+
+def compact_response(response):
+    """
+    stand-in for an API response that keeps just what getchoice() and
+    get_usage() read (and pickles). other objects are returned as-is.
+    """
+    if not hasattr(response, "choices"):
+        return response
+    choices = []
+    for choice in response.choices:
+        compact = SimpleNamespace(
+            index=choice.index, finish_reason=choice.finish_reason
+        )
+        if hasattr(choice, "message"):
+            compact.message = SimpleNamespace(
+                role=choice.message.role, content=choice.message.content
+            )
+        else:
+            compact.text = choice.text
+        choices.append(compact)
+    usage = None
+    if getattr(response, "usage", None) is not None:
+        usage = SimpleNamespace(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            total_tokens=response.usage.total_tokens,
+        )
+    return SimpleNamespace(
+        model=getattr(response, "model", None), choices=choices, usage=usage
+    )
+
+
+def _choice_text(choice) -> Optional[str]:
+    if hasattr(choice, "message"):
+        return choice.message.content
+    return getattr(choice, "text", None)
+
+
+def history_for(settings: Mapping) -> "History":
+    """History sized / sunk as the "history_size" / "history_sink" say"""
+    return History(
+        settings.get("history_size", HISTORY_SIZE),
+        settings.get("history_sink"),
+    )
+
+
+def error_log() -> deque:
+    """bounded list for exc_report() entries"""
+    return deque(maxlen=ERRORS_SIZE)
+
+
+class Event(Mapping):
+    """
+    compact record of an API event. reads like a dict of its fields that
+    aren't None (so history consumers can treat events as mappings).
+    """
+    __slots__ = (
+        "category", "time", "model", "prompt", "response", "plan", "status"
+    )
+
+    def __init__(
+        self,
+        category: str,
+        prompt: Any = None,
+        response: Any = None,
+        model: Optional[str] = None,
+        plan: Optional[dict] = None,
+        status: Optional[str] = None,
+        time: Optional[str] = None,
+    ):
+        self.category = category
+        self.time = time or dt.datetime.now().isoformat()[:-3]
+        self.response = compact_response(response)
+        # the model that actually answered, if the response says
+        self.model = getattr(self.response, "model", None) or model
+        self.prompt, self.plan, self.status = prompt, plan, status
+
+    def __getitem__(self, key: str):
+        if (key not in self.__slots__) or (getattr(self, key) is None):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return (k for k in self.__slots__ if getattr(self, k) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def usage(self) -> tuple[int, int]:
+        """prompt and completion tokens, if this was a metered API call"""
+        if (usage := getattr(self.response, "usage", None)) is None:
+            return 0, 0
+        return usage.prompt_tokens, usage.completion_tokens
+
+    def to_json(self) -> str:
+        record = dict(self)
+        if hasattr(self.response, "choices"):
+            record["response"] = list(map(_choice_text, self.response.choices))
+            record["usage"] = self.usage()
+        return json.dumps(record, default=repr)
+
+    def __repr__(self):
+        return f"Event({dict(self)!r})"
+
+
+class History:
+    """
+    the last maxlen (or, if None, all) events, plus running token totals
+    per model. if sink is given, every event is also appended to it as a
+    line of JSON.
+    """
+
+    def __init__(
+        self,
+        maxlen: Optional[int] = HISTORY_SIZE,
+        sink: Union[str, Path, None] = None,
+    ):
+        self.events: deque[Event] = deque(maxlen=maxlen)
+        self.sink = Path(sink) if sink is not None else None
+        # model -> [prompt tokens, completion tokens]
+        self.tokens: dict[Optional[str], list[int]] = {}
+        self.recorded = 0
+        self._lock, self._stream = threading.Lock(), None
+
+    def record(
+        self, category: str, prompt=None, response=None, **fields
+    ) -> Event:
+        event = Event(category, prompt, response, **fields)
+        self.append(event)
+        return event
+
+    def append(self, event: Event):
+        prompt_tokens, completion_tokens = event.usage()
+        with self._lock:
+            self.events.append(event)
+            self.recorded += 1
+            if prompt_tokens or completion_tokens:
+                tally = self.tokens.setdefault(event.model, [0, 0])
+                tally[0] += prompt_tokens
+                tally[1] += completion_tokens
+            if self.sink is not None:
+                self._spill(event)
+
+    def _spill(self, event: Event):
+        if self._stream is None:
+            self.sink.parent.mkdir(parents=True, exist_ok=True)
+            self._stream = self.sink.open("a", encoding="utf-8", buffering=1)
+        self._stream.write(event.to_json() + "\n")
+
+    def model_usage(self) -> dict[Optional[str], dict[str, int]]:
+        """tokens used per model"""
+        with self._lock:
+            return {
+                model: {"prompt": p, "completion": c, "total": p + c}
+                for model, (p, c) in self.tokens.items()
+            }
+
+    @property
+    def usage(self) -> dict[str, int]:
+        """tokens used by all events ever recorded (not just those kept)"""
+        with self._lock:
+            prompt = sum(p for p, _ in self.tokens.values())
+            completion = sum(c for _, c in self.tokens.values())
+        return {
+            "prompt": prompt,
+            "completion": completion,
+            "total": prompt + completion,
+        }
+
+    @property
+    def cost(self) -> dict[str, float]:
+        """dollars spent on all events ever recorded, priced per model"""
+        prompt, completion = 0, 0
+        with self._lock:
+            for model, (p, c) in self.tokens.items():
+                if model is None:
+                    continue
+                prompt += estimate_cost(model, p, 0)
+                completion += estimate_cost(model, 0, c)
+        return {
+            "prompt": prompt,
+            "completion": completion,
+            "total": prompt + completion,
+        }
+
+    def clear(self):
+        """forget kept events (running totals are not reset)"""
+        with self._lock:
+            self.events.clear()
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __getitem__(self, ix: Union[int, slice]):
+        if isinstance(ix, slice):
+            return list(self.events)[ix]
+        return self.events[ix]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"], state["_stream"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock, self._stream = threading.Lock(), None
+
+    def __repr__(self):
+        return (
+            f"History({len(self)} of {self.recorded} events, "
+            f"usage={self.usage})"
+        )
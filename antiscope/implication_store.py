@@ -0,0 +1,189 @@
+"""
+durable, content-addressed store for implied function sources.
+
+entries are keyed by a canonical fingerprint of what was implied (the
+AST-normalized definition or description, the performativity, and the
+model), so cosmetic edits to a decorated function do not invalidate them.
+sources live in objects/<sha256 of source>.py; refs/<fingerprint>.json
+points a fingerprint at a source object and records whether it is pinned.
+all writes are atomic renames, so one store can be shared by many processes.
+"""
+import ast
+import datetime as dt
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Mapping, Optional, Union
+
+from antiscope.response_cache import DEFAULT_CACHE_DIR
+from antiscope.artifacts import artifacts
+
+DEFAULT_STORE_PATH = DEFAULT_CACHE_DIR / "implications"
+
+
+def normalize_source(text: str) -> str:
+    """
+    canonical form of a chunk of source code: its AST dump if it parses
+    (on its own, or as a bare function header), otherwise its text with
+    runs of whitespace collapsed.
+    """
+    for candidate in (text, f"{text}\n    ..."):
+        try:
+            return ast.dump(ast.parse(candidate))
+        except (SyntaxError, ValueError):
+            continue
+    return " ".join(text.split())
+
+
+def _canonical_description(description: Any) -> Any:
+    if callable(description):
+        return normalize_source(artifacts(description).definition)
+    if isinstance(description, str):
+        return normalize_source(description)
+    if isinstance(description, Mapping):
+        return {
+            str(k): _canonical_description(v) for k, v in description.items()
+        }
+    return repr(description)
+
+
+def implication_fingerprint(
+    description: Any,
+    performativity: Optional[str] = None,
+    model: Optional[str] = None
+) -> str:
+    blob = json.dumps(
+        {
+            "description": _canonical_description(description),
+            "performativity": performativity,
+            "model": model,
+        },
+        sort_keys=True,
+        default=repr,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as stream:
+            stream.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class ImplicationStore:
+    """
+    directory-backed store of implied sources. pinned entries are never
+    overwritten by put() and are served even when a reload is requested;
+    invalidate() removes an entry whether or not it is pinned.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None):
+        self.path = Path(path) if path is not None else DEFAULT_STORE_PATH
+        (self.path / "objects").mkdir(parents=True, exist_ok=True)
+        (self.path / "refs").mkdir(parents=True, exist_ok=True)
+
+    def _refpath(self, fingerprint: str) -> Path:
+        return self.path / "refs" / f"{fingerprint}.json"
+
+    def _objpath(self, digest: str) -> Path:
+        return self.path / "objects" / f"{digest}.py"
+
+    def _ref(self, fingerprint: str) -> Optional[dict]:
+        try:
+            return json.loads(self._refpath(fingerprint).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def get(self, fingerprint: str) -> Optional[str]:
+        if (ref := self._ref(fingerprint)) is None:
+            return None
+        try:
+            return self._objpath(ref["source"]).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def put(
+        self, fingerprint: str, source: str, pinned: bool = False
+    ) -> bool:
+        """
+        record source for fingerprint. returns False (and writes nothing)
+        if fingerprint is pinned to a different source.
+        """
+        digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        ref = self._ref(fingerprint)
+        if (ref is not None) and ref.get("pinned") and (not pinned):
+            return ref["source"] == digest
+        if not (objpath := self._objpath(digest)).exists():
+            _atomic_write(objpath, source)
+        _atomic_write(
+            self._refpath(fingerprint),
+            json.dumps(
+                {
+                    "source": digest,
+                    "pinned": pinned,
+                    "time": dt.datetime.now().isoformat()[:-3],
+                }
+            ),
+        )
+        return True
+
+    def pinned(self, fingerprint: str) -> bool:
+        return bool((self._ref(fingerprint) or {}).get("pinned"))
+
+    def pin(self, fingerprint: str, source: Optional[str] = None):
+        """pin fingerprint to source (by default, its current source)"""
+        if source is None:
+            source = self.get(fingerprint)
+        if source is None:
+            raise KeyError(f"nothing stored for {fingerprint}")
+        self.put(fingerprint, source, pinned=True)
+
+    def unpin(self, fingerprint: str):
+        if (ref := self._ref(fingerprint)) is not None:
+            _atomic_write(
+                self._refpath(fingerprint), json.dumps(ref | {"pinned": False})
+            )
+
+    def invalidate(self, fingerprint: str):
+        """
+        forget fingerprint. source objects are left in place: other
+        fingerprints may share them.
+        """
+        self._refpath(fingerprint).unlink(missing_ok=True)
+
+    def __contains__(self, fingerprint: str):
+        return self._refpath(fingerprint).exists()
+
+    def __repr__(self):
+        return f"ImplicationStore({self.path})"
+
+
+_STORES: dict[Path, ImplicationStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_implication_store(
+    spec: Union[ImplicationStore, str, Path, bool, None]
+) -> Optional[ImplicationStore]:
+    """
+    resolve a store specification: an ImplicationStore, True (the default
+    location), a path, or None / False (no store).
+    """
+    if isinstance(spec, ImplicationStore):
+        return spec
+    if spec is None or spec is False:
+        return None
+    path = DEFAULT_STORE_PATH if spec is True else Path(spec)
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = ImplicationStore(path)
+        return _STORES[path]
@@ -0,0 +1,207 @@
+"""
+per-stage latency instrumentation for evocation / implication.
+
+instrumented code wraps each stage in `with span(stage):`. spans are
+timed and recorded per (stage, function name) only while instrumentation
+is enabled (enable(), profile(), or the ANTISCOPE_INSTRUMENT environment
+variable); otherwise span() returns a shared do-nothing context manager.
+a span given a function name passes it on to the spans nested inside it.
+
+pre hooks are called as hook(stage, name) when a span opens; post hooks
+as hook(stage, name, seconds, exc_type) when it closes. report() gives
+count / mean / p50 / p95 / p99 / max per stage and name (percentiles over
+the most recent SAMPLES timings); dump() prints them.
+"""
+import os
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, Iterator, Optional, TextIO
+
+# recent timings kept per (stage, name) for percentiles
+SAMPLES = 4096
+PERCENTILES = (50, 95, 99)
+
+_enabled = bool(os.environ.get("ANTISCOPE_INSTRUMENT"))
+HOOKS: dict[str, list[Callable]] = {"pre": [], "post": []}
+_name: ContextVar[Optional[str]] = ContextVar("instrument_name", default=None)
+
+
+class Timings:
+    """timing records per (stage, function name)"""
+
+    def __init__(self):
+        self.records: dict[tuple[str, Optional[str]], dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, name: Optional[str], seconds: float):
+        with self._lock:
+            if (record := self.records.get((stage, name))) is None:
+                record = self.records[(stage, name)] = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "samples": deque(maxlen=SAMPLES),
+                }
+            record["count"] += 1
+            record["total"] += seconds
+            record["max"] = max(record["max"], seconds)
+            record["samples"].append(seconds)
+
+    def report(self) -> dict[str, dict[Optional[str], dict[str, float]]]:
+        """summary statistics (in seconds) per stage, then per name"""
+        with self._lock:
+            records = {
+                key: record | {"samples": sorted(record["samples"])}
+                for key, record in self.records.items()
+            }
+        report = {}
+        for (stage, name), record in sorted(
+            records.items(), key=lambda kv: (kv[0][0], str(kv[0][1]))
+        ):
+            samples = record["samples"]
+            report.setdefault(stage, {})[name] = {
+                "count": record["count"],
+                "mean": record["total"] / record["count"],
+                **{f"p{q}": _percentile(samples, q) for q in PERCENTILES},
+                "max": record["max"],
+            }
+        return report
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+
+def _percentile(ordered: list[float], q: int) -> float:
+    return ordered[min(len(ordered) * q // 100, len(ordered) - 1)]
+
+
+# everything recorded while enabled
+TIMINGS = Timings()
+# TIMINGS, plus those of any active profile() blocks
+_collectors: list[Timings] = [TIMINGS]
+
+
+class _Span:
+    __slots__ = ("stage", "name", "start", "token")
+
+    def __init__(self, stage: str, name: Optional[str]):
+        self.stage, self.name, self.token = stage, name, None
+
+    def __enter__(self):
+        if self.name is None:
+            self.name = _name.get()
+        else:
+            self.token = _name.set(self.name)
+        for hook in HOOKS["pre"]:
+            hook(self.stage, self.name)
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        seconds = perf_counter() - self.start
+        if self.token is not None:
+            _name.reset(self.token)
+        for timings in _collectors:
+            timings.add(self.stage, self.name, seconds)
+        for hook in HOOKS["post"]:
+            hook(self.stage, self.name, seconds, exc_type)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(stage: str, name: Optional[str] = None):
+    """context manager timing a stage (of the named function's call)"""
+    if _enabled is False:
+        return NULL_SPAN
+    return _Span(stage, name)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def add_hook(when: str, hook: Callable):
+    """
+    call hook when spans open (when="pre") or close (when="post"). hooks
+    run in the instrumented code's thread, so they should be quick.
+    """
+    HOOKS[when].append(hook)
+
+
+def remove_hook(when: str, hook: Callable):
+    HOOKS[when].remove(hook)
+
+
+@contextmanager
+def profile() -> Iterator[Timings]:
+    """
+    record timings for the enclosed block (enabling instrumentation for
+    its duration). yields a Timings whose report() covers just the block.
+    """
+    global _enabled
+    timings, was_enabled = Timings(), _enabled
+    _collectors.append(timings)
+    _enabled = True
+    try:
+        yield timings
+    finally:
+        _collectors.remove(timings)
+        _enabled = was_enabled
+
+
+def report() -> dict[str, dict[Optional[str], dict[str, float]]]:
+    """statistics for everything recorded so far (see Timings.report())"""
+    return TIMINGS.report()
+
+
+def reset():
+    TIMINGS.clear()
+
+
+def dump(
+    timings: Optional[Timings] = None, file: Optional[TextIO] = None
+):
+    """print a table of timings (by default, all of them) in milliseconds"""
+    timings = timings if timings is not None else TIMINGS
+    file = file if file is not None else sys.stdout
+    columns = ("count", "mean", *(f"p{q}" for q in PERCENTILES), "max")
+    print(
+        f"{'stage':<24}{'function':<20}"
+        + "".join(f"{c:>10}" for c in columns),
+        file=file,
+    )
+    for stage, names in timings.report().items():
+        for name, stats in names.items():
+            cells = [f"{stats['count']:>10}"] + [
+                f"{stats[c] * 1000:>10.3f}" for c in columns[1:]
+            ]
+            print(
+                f"{stage:<24}{str(name or '-'):<20}" + "".join(cells),
+                file=file,
+            )
@@ -15,19 +15,31 @@ from typing import (
 )
 
 from antiscope.dynamic import Dynamic, UnreadyError, AlreadyLoadedError
+from antiscope.history import error_log, history_for
+from antiscope.implication_store import (
+    ImplicationStore, get_implication_store, implication_fingerprint
+)
+from antiscope.singleflight import SingleFlight
 from antiscope.utilz import (
+    compact_report,
     digsource,
     exc_report,
     pluck_from_execution,
     filter_assignment,
+    to_thread,
 )
 
 
-# TODO: async versions. maybe only needs to happen at implementation level,
-#  but there might be helper structures here. implementations still need to
-#  be responsible for not blocking when running async (but not parallel).
-#  if we do want true parallelism we will probably want to implement pickling
-#  functionality for these classes.
+# NOTE: async versions (aload, acall, aimply, aevoke) mostly live at the
+#  implementation level. implementations are responsible for not blocking
+#  the event loop (running local work in worker threads where it is costly).
+# NOTE: Irrealis and Implication objects pickle (see Dynamic.__getstate__),
+#  so they can be sent to worker processes or cached. loaded functions are
+#  rebuilt from their code without implying them again.
+
+
+# concurrent first calls to the same object share a single load
+LOAD_FLIGHTS = SingleFlight()
 
 
 class ImplicationFailure(Exception):
@@ -70,9 +82,17 @@ class Irrealis(Dynamic, ABC):
         lazy: bool = True,
         auto_reimply: bool = False,
         globals_: Optional[dict] = None,
+        store: Union[ImplicationStore, str, bool, None] = None,
+        smoke_args: Optional[tuple] = None,
         **api_kwargs
     ):
         self.description = description
+        # if not None, implied functions must accept these args without
+        # raising an exception to be loaded
+        self.smoke_args = smoke_args
+        # remaining implied sources, for fallback (see _load_candidates)
+        self.candidates = []
+        self.store = get_implication_store(store)
         self.side = side
         self.stance = stance
         # no default effect. may be used by implementations of this class
@@ -81,7 +101,7 @@ class Irrealis(Dynamic, ABC):
         self.auto_reimply = auto_reimply
         self.imply_fail = False
         self.evoke_fail = False
-        self.history = []
+        self.history = history_for(self.api_settings)
         if self.stance == "implicit":
             source = None
         elif isinstance(description, Callable):
@@ -105,22 +125,159 @@ class Irrealis(Dynamic, ABC):
             return super().load(reload)
         if (self.source is not None) and (reload is False):
             raise AlreadyLoadedError
-        self.imply_fail = True
+        if self._load_stored(reload) is True:
+            return
+        self.imply_fail, self.candidates = True, []
         try:
             self.source = self.imply()
             self.imply_fail = False
         except KeyboardInterrupt:
             raise
-        except ImplicationFailure:
-            # this case means exception was logged by the
-            # implementation of self.imply
-            if self.optional is False:
-                raise
         except Exception as ex:
+            self._handle_imply_exception(ex)
+        return self._finish_load(reload)
+
+    async def aload(self, reload=False):
+        """
+        async version of load(). store access and compilation run in
+        worker threads.
+        """
+        if self.stance == "explicit":
+            return await to_thread(super().load, reload)
+        if (self.source is not None) and (reload is False):
+            raise AlreadyLoadedError
+        if await to_thread(self._load_stored, reload) is True:
+            return
+        self.imply_fail, self.candidates = True, []
+        try:
+            self.source = await self.aimply()
+            self.imply_fail = False
+        except KeyboardInterrupt:
+            raise
+        except Exception as ex:
+            self._handle_imply_exception(ex)
+        return await to_thread(self._finish_load, reload)
+
+    def _handle_imply_exception(self, ex: Exception):
+        # ImplicationFailure means exception was logged by the
+        # implementation of self.imply
+        if not isinstance(ex, ImplicationFailure):
             self.errors.append(exc_report(ex) | {"category": "imply"})
-            if self.optional is False:
+        if self.optional is False:
+            raise ex
+
+    def _finish_load(self, reload=False):
+        result = self._load_candidates(reload)
+        if (
+            (self.store is not None)
+            and (self.func is not None)
+            and not (self.imply_fail or self.compile_fail)
+        ):
+            self.store.put(self.fingerprint(), self.source)
+        return result
+
+    def _load_candidates(self, reload=False):
+        """
+        load self.source. if it fails to compile, define or pass its smoke
+        call, fall back to the remaining candidates from the last
+        implication, in order, without making another request.
+        """
+        while True:
+            try:
+                result = super().load(reload)
+                passed = (self.compile_fail is False) and self._smoke()
+            except KeyboardInterrupt:
                 raise
-        return super().load(reload)
+            except Exception as ex:
+                if not self.candidates:
+                    raise
+                # compile errors are already logged
+                if self.compile_fail is False:
+                    self.errors.append(exc_report(ex) | {"category": "define"})
+                passed = False
+            if passed or not self.candidates:
+                return result
+            self._next_candidate()
+            reload = True
+
+    def _next_candidate(self):
+        self.source = self.candidates.pop(0)
+        self.code, self.func, self.compile_fail = None, None, False
+
+    def _smoke(self) -> bool:
+        """call the loaded function with self.smoke_args, if any"""
+        if self.smoke_args is None:
+            return True
+        try:
+            self.func(*self.smoke_args)
+            return True
+        except KeyboardInterrupt:
+            raise
+        except Exception as ex:
+            self.errors.append(
+                exc_report(ex) | {"func": self.func, "category": "smoke"}
+            )
+            return False
+
+    def fall_back(self) -> bool:
+        """
+        replace the loaded function with the next remaining candidate from
+        the last implication. returns False if there are none left.
+        """
+        if not self.candidates:
+            return False
+        self._next_candidate()
+        self._finish_load(reload=True)
+        return True
+
+    def _load_stored(self, reload=False) -> bool:
+        """
+        try to load a previously-implied source from self.store. on reload,
+        only pinned entries are used. returns True on success.
+        """
+        if self.store is None:
+            return False
+        fingerprint = self.fingerprint()
+        if (reload is True) and not self.store.pinned(fingerprint):
+            return False
+        if (source := self.store.get(fingerprint)) is None:
+            return False
+        self.source = source
+        try:
+            super().load(reload=True)
+        except KeyboardInterrupt:
+            raise
+        except Exception as ex:
+            self.errors.append(exc_report(ex) | {"category": "store"})
+        if (self.func is not None) and (self.compile_fail is False):
+            return True
+        # stale or broken entry; fall back to implying
+        self.source, self.code, self.func = None, None, None
+        self.compile_fail = False
+        return False
+
+    def fingerprint(self) -> str:
+        """canonical key for this object's implication"""
+        return implication_fingerprint(
+            self.description,
+            self.performativity,
+            self.api_settings.get("model")
+        )
+
+    def pin(self):
+        """pin the current source in self.store for this implication"""
+        if (self.store is None) or (self.source is None):
+            raise UnreadyError("no store or no source to pin.")
+        self.store.pin(self.fingerprint(), self.source)
+
+    def unpin(self):
+        if self.store is not None:
+            self.store.unpin(self.fingerprint())
+
+    def invalidate(self):
+        """forget any stored source for this implication"""
+        if self.store is not None:
+            self.store.invalidate(self.fingerprint())
 
     @abstractmethod
     def evoke(self, *args, _optional=None, **kwargs):
@@ -130,26 +287,77 @@ class Irrealis(Dynamic, ABC):
     def imply(self, _sideload_settings: Optional[Mapping] = None) -> str:
         raise NotImplementedError
 
+    async def aevoke(self, *args, _optional=None, **kwargs):
+        raise NotImplementedError
+
+    async def aimply(
+        self, _sideload_settings: Optional[Mapping] = None
+    ) -> str:
+        raise NotImplementedError
+
+    def _maybe_load_on_call(self, reload=False):
+        if self.func is not None:
+            return
+        return LOAD_FLIGHTS.do(
+            id(self), lambda: super(Irrealis, self)._maybe_load_on_call(reload)
+        )
+
+    async def _amaybe_load_on_call(self, reload=False):
+        if self.func is not None:
+            return
+        if self.load_on_call is False:
+            raise UnreadyError("No loaded function.")
+        return await LOAD_FLIGHTS.ado(id(self), lambda: self.aload(reload))
+
     def invoke(self, *args, _optional=None, **kwargs):
-        _optional = self.optional if _optional is None else _optional
         return super().__call__(*args, _optional=_optional, **kwargs)
 
+    def _bind(self):
+        # evocative calls never run the loaded function directly
+        super()._bind()
+        if self.side == "evocative":
+            self._fast = None
+
     def unload(self):
         super().unload()
-        self.imply_fail, self.evoke_fail, self.history = False, False, []
+        self.imply_fail, self.evoke_fail = False, False
+        self.history = history_for(self.api_settings)
+        self.candidates = []
 
     def set(self, api_attr, val):
         self.api_settings[api_attr] = val
 
+    def __getstate__(self) -> dict:
+        state = super().__getstate__()
+        if isinstance(self.description, FunctionType):
+            # usually shadowed in its module by this object, so it can't be
+            # pickled by reference
+            state["description"] = digsource(self.description)
+        # call sites captured by __call__ hold the caller's globals
+        state.pop("csource", None)
+        return state
+
     def __call__(self, *args, _optional=None, **kwargs):
+        if (_optional is None) and ((fast := self._fast) is not None):
+            return fast(*args, **kwargs)
         reload = (self.stance == "implicit") and self.auto_reimply
-        super()._maybe_load_on_call(reload=reload)
+        self._maybe_load_on_call(reload=reload)
         if self.side == "invocative":
             return self.invoke(*args, _optional=_optional, **kwargs)
         return self.evoke(*args, _optional=_optional, **kwargs)
 
+    async def acall(self, *args, _optional=None, **kwargs):
+        """awaitable version of __call__()"""
+        reload = (self.stance == "implicit") and self.auto_reimply
+        await self._amaybe_load_on_call(reload)
+        if self.side == "invocative":
+            return self.invoke(*args, _optional=_optional, **kwargs)
+        return await self.aevoke(*args, _optional=_optional, **kwargs)
+
     default_api_settings: MappingProxyType
     __name__ = "<unloaded Irrealis>"
+    side = "invocative"
+    smoke_args = None
 
 
 # TODO: should this actually have a Dynamic-analogous base class that, like,
@@ -184,8 +392,8 @@ class Implication(ABC):
         self.source = None
         self.load_on_access = load_on_access
         self.auto_retry_failed = auto_retry_failed
-        self.errors = []
-        self.history = []
+        self.errors = error_log()
+        self.history = history_for(self.api_settings)
         if self.lazy is False:
             self.load()
 
@@ -206,18 +414,59 @@ class Implication(ABC):
             self.imply_fail = False
         except KeyboardInterrupt:
             raise
-        except ImplicationFailure as exc:
-            exception = exc
-            # this case means exception was logged by the implementation
-            # of self.imply
         except Exception as exc:
             exception = exc
-            self.errors.append(exc_report(exc) | {"category": "imply"})
+            self._log_imply_exception(exc)
         if self.imply_fail is True:
             self._raise_if_nonoptional(ImplicationFailure(str(exception)))
             return False
         return self.evaluate()
 
+    async def aload(self, reload=False) -> bool:
+        """async version of load(). evaluation runs in a worker thread."""
+        if (self.source is not None) and (reload is False):
+            raise AlreadyLoadedError
+        self.imply_fail, exception = True, None
+        try:
+            self.source = await self.aimply()
+            self.imply_fail = False
+        except KeyboardInterrupt:
+            raise
+        except Exception as exc:
+            exception = exc
+            self._log_imply_exception(exc)
+        if self.imply_fail is True:
+            self._raise_if_nonoptional(ImplicationFailure(str(exception)))
+            return False
+        return await to_thread(self.evaluate)
+
+    def __getstate__(self) -> dict:
+        """
+        pickle everything but the implied object, unless it's a literal;
+        other objects are evaluated again from source when unpickled.
+        """
+        state = self.__dict__.copy()
+        state["errors"] = error_log()
+        state["errors"].extend(map(compact_report, self.errors))
+        if self.eval_mode != "literal":
+            state["obj"] = None
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        if (
+            (self.eval_mode != "literal")
+            and (self.source is not None)
+            and not (self.imply_fail or self.eval_fail)
+        ):
+            self.evaluate()
+
+    def _log_imply_exception(self, exc: Exception):
+        # ImplicationFailure means exception was logged by the
+        # implementation of self.imply
+        if not isinstance(exc, ImplicationFailure):
+            self.errors.append(exc_report(exc) | {"category": "imply"})
+
     def evaluate(self, *, globals_=None, **kwargs) -> bool:
         globals_ = globals_ if globals_ is not None else globals()
         self.eval_fail = True
@@ -242,6 +491,9 @@ class Implication(ABC):
     def imply(self) -> str:
         raise NotImplementedError
 
+    async def aimply(self) -> str:
+        raise NotImplementedError
+
     def _raise_if_nonoptional(self, exctype: Exception = UnreadyError):
         if self.optional is True:
             return
@@ -255,7 +507,7 @@ class Implication(ABC):
     def getobjattr(self, attr):
         if self.obj is None:
             return self._raise_if_nonoptional()
-        self.obj.__getattr__(attr)
+        return getattr(self.obj, attr)
 
     @staticmethod
     def literalize(text):
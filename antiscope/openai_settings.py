@@ -40,8 +40,61 @@ DEFAULT_SETTINGS = MappingProxyType(
     }
 )
 
+# settings keys not in EP_KWARGS are never sent to the API. some of them
+# control local behavior:
+# "cache": True, a path, or a ResponseCache -- serve / save responses from /
+#   to an on-disk cache (see antiscope.response_cache). off by default.
+# "coalesce": bool -- share one API call between identical concurrent
+#   requests. defaults to True only when "temperature" is 0. only the
+#   request that made the call gets its usage, so it is counted once.
+# "stream": True -- (for OAIrrealis) evocations stream, returning an iterator
+#   over elements of the evoked sequence as they are generated. (for
+#   Conversation) replies are rendered as they are generated.
+# "dry_run": True -- return a MockCompletion rather than calling the API.
+# "arg_budget": int or None -- approximate tokens allowed per argument in
+#   evocation prompts before it is summarized (see antiscope.serializers).
+#   defaults to ARG_BUDGET. None means never summarize.
+# "structured": True -- (chat models) request evocation results as JSON
+#   constrained by a strict-mode schema derived from the function's return
+#   annotation, and decode them with json.loads (see antiscope.schema).
+#   needs a model that supports json_schema response formats (see
+#   STRUCTURED_MODELS), and a return type strict mode can express; other
+#   evocations are made as usual.
+# "candidates": int -- number of function definitions to request (as n) in
+#   each implication. an implied object loads the first one that compiles,
+#   defines and passes its smoke call, and keeps the rest for fallback.
+#   candidates are deduplicated, so this is useful only at temperature > 0.
+# "validate": True or a dict -- before loading implied functions, run the
+#   candidates against their args_like / return_like examples in sandboxed
+#   subprocesses (see antiscope.validation), discarding those that fail and
+#   re-implying if none pass. dict options: "timeout" (seconds), "memory"
+#   (bytes) and "retries" (extra requests, default 1).
+# "history_size": int or None -- events kept in memory in the history of
+#   implied / evoked objects and conversations (see antiscope.history).
+#   defaults to antiscope.history.HISTORY_SIZE. None means unbounded.
+# "history_sink": path -- also append every history event to this JSONL
+#   file.
+# "context_window": int -- prompt tokens allowed to chat message contexts
+#   (Conversation, or a "message_context"; see antiscope.context). defaults
+#   to the model's context window less "max_tokens".
+# "context_strategy": "slide" or "summarize" -- drop the oldest unpinned
+#   turns that don't fit the window, or replace them with a summary.
+# "context_summarizer": callable -- makes that summary from a list of the
+#   dropped messages. by default, a local summary of excerpts.
+# "cassette": path or Cassette -- record API requests and responses to, and
+#   replay them from, a cassette file (see antiscope.cassette). a path is
+#   used in "auto" mode: replay what matches, record the rest.
+# "message_context": list of messages or MessageContext -- (chat models)
+#   messages to send before a string prompt, fitted to the window.
+
+ARG_BUDGET = 256
+
 CHATGPT_FORMAT = "Format your response as valid Python. "
 CHATGPT_NO = "Do not write explanations. Do not provide examples. "
+JSON_FORMAT = (
+    'Format your response as a JSON object whose "result" field holds the '
+    'return value. '
+)
 
 IEXEC_CHAT = (
     "Show me an example of what this function execution might return. "
@@ -55,7 +108,32 @@ REVERSE_CHAT = (
     'result.'
 )
 
-CHAT_MODELS = ("gpt-3.5-turbo", "gpt-4")
+CHAT_MODELS = (
+    "gpt-3.5-turbo",
+    "gpt-4",
+    "gpt-4o",
+    "gpt-4o-mini",
+    "gpt-4.1",
+    "gpt-4.1-mini",
+    "gpt-4.1-nano",
+)
+# chat models that support json_schema response formats (strict mode).
+# matched by prefix. (gpt-4o snapshots before 2024-08-06 don't.)
+STRUCTURED_MODELS = ("gpt-4o", "gpt-4.1")
+
+# tokens of context (prompt + completion). matched by longest prefix.
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "ada": 2049,
+    "babbage": 2049,
+    "curie": 2049,
+    "davinci": 2049,
+}
 
 compl_kwargs = (
     "model",
@@ -66,14 +144,24 @@ compl_kwargs = (
     "top_p",
     "logprobs",
     "stop",
-    "logit_bias"
+    "logit_bias",
+    "n",
 )
 
-EP_KWARGS = {"completions": compl_kwargs, "chat-completions": compl_kwargs}
+EP_KWARGS = {
+    "completions": compl_kwargs,
+    "chat-completions": compl_kwargs + ("response_format",),
+}
 
 # $ / 1000 tokens
+# (matched by the first prefix, so more specific prefixes come first)
 PRICING = {
     "gpt-3.5-turbo": {"prompt": 0.002, "completion": 0.002},
+    "gpt-4o-mini": {"prompt": 0.00015, "completion": 0.0006},
+    "gpt-4o": {"prompt": 0.0025, "completion": 0.01},
+    "gpt-4.1-mini": {"prompt": 0.0004, "completion": 0.0016},
+    "gpt-4.1-nano": {"prompt": 0.0001, "completion": 0.0004},
+    "gpt-4.1": {"prompt": 0.002, "completion": 0.008},
     # TODO: distinguish context size
     "gpt-4": {"prompt": 0.03, "completion": 0.06},
     "ada": {"prompt": 0.0004, "completion": 0.0004},
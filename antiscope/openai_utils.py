@@ -1,17 +1,59 @@
 import datetime as dt
 import re
+import threading
+import time
 from operator import xor
 from typing import Union, Mapping, Collection, Optional
 
-from cytoolz import keyfilter
-from openai import OpenAI
+from cytoolz import groupby, keyfilter
 
 from antiscope.openai_settings import (
     EP_KWARGS, CHAT_MODELS, DEFAULT_SETTINGS, PRICING, get_secrets
 )
+from antiscope.cassette import get_cassette
+from antiscope.context import MessageContext
+from antiscope.governor import Governor, is_rate_limit_error
+from antiscope.response_cache import get_response_cache, request_key
+from antiscope.singleflight import SingleFlight
+from antiscope.utilz import to_thread
 
 
-client = OpenAI(**get_secrets())
+# API clients (and the OpenAI SDK, and API secrets) are loaded on first use,
+# keeping import of this module fast and free of side effects. assigning
+# to openai_utils.client / openai_utils.aclient overrides them.
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """OpenAI client, constructed on first use"""
+    global client
+    if "client" not in globals():
+        with _client_lock:
+            if "client" not in globals():
+                from openai import OpenAI
+
+                client = OpenAI(**get_secrets())
+    return client
+
+
+def get_async_client():
+    """AsyncOpenAI client, constructed on first use"""
+    global aclient
+    if "aclient" not in globals():
+        with _client_lock:
+            if "aclient" not in globals():
+                from openai import AsyncOpenAI
+
+                aclient = AsyncOpenAI(**get_secrets())
+    return aclient
+
+
+def __getattr__(name):
+    if name == "client":
+        return get_client()
+    if name == "aclient":
+        return get_async_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _codestrippable(line):
@@ -56,27 +98,222 @@ def addmsg(msg, hist):
     return hist + [{"role": "user", "content": msg}]
 
 
-def _call_openai_completion(prompt, _settings):
+def dump_response(response) -> str:
+    return response.model_dump_json()
+
+
+def load_response(kind: str, text: str):
+    """rebuild a response serialized by dump_response()"""
+    if kind == "chat-completions":
+        from openai.types.chat import ChatCompletion
+
+        return ChatCompletion.model_validate_json(text)
+    from openai.types import Completion
+
+    return Completion.model_validate_json(text)
+
+
+_governor: Optional[Governor] = None
+
+
+def set_governor(governor: Optional[Governor]):
+    """
+    install a process-wide Governor (or, with None, remove it). all API
+    requests made through complete() / acomplete() will pass through it.
+    """
+    global _governor
+    _governor = governor
+
+
+def get_governor() -> Optional[Governor]:
+    return _governor
+
+
+def _governed(payload, kwargs, request):
+    if _governor is None:
+        return request()
+    return _governor.call(payload, kwargs, request)
+
+
+async def _agoverned(payload, kwargs, arequest):
+    if _governor is None:
+        return await arequest()
+    return await _governor.acall(payload, kwargs, arequest)
+
+
+# identical requests in flight at the same time share a single API call
+REQUEST_FLIGHTS = SingleFlight()
+
+
+def _coalesces(_settings) -> bool:
+    """
+    should identical concurrent requests share a response? by default, only
+    when sampling is deterministic (temperature 0).
+    """
+    if (coalesce := _settings.get("coalesce")) is not None:
+        return bool(coalesce)
+    return _settings.get("temperature") == 0
+
+
+def _create(kind, payload, kwargs, _settings, request):
+    if (cassette := get_cassette(_settings.get("cassette"))) is not None:
+        return cassette.play(
+            kind,
+            payload,
+            kwargs,
+            lambda: _shared_create(kind, payload, kwargs, _settings, request)
+        )
+    return _shared_create(kind, payload, kwargs, _settings, request)
+
+
+async def _acreate(kind, payload, kwargs, _settings, arequest):
+    if (cassette := get_cassette(_settings.get("cassette"))) is not None:
+        return await cassette.aplay(
+            kind,
+            payload,
+            kwargs,
+            lambda: _ashared_create(kind, payload, kwargs, _settings, arequest)
+        )
+    return await _ashared_create(kind, payload, kwargs, _settings, arequest)
+
+
+def _unmetered(response):
+    """
+    a coalesced follower's copy of the leader's response, without the
+    usage, which the leader's copy already accounts for
+    """
+    if hasattr(response, "model_copy"):
+        return response.model_copy(update={"usage": None})
+    return response
+
+
+def _shared_create(kind, payload, kwargs, _settings, request):
+    if _coalesces(_settings) is False:
+        return _cached_create(kind, payload, kwargs, _settings, request)
+    return REQUEST_FLIGHTS.do(
+        request_key(kind, payload, kwargs),
+        lambda: _cached_create(kind, payload, kwargs, _settings, request),
+        _unmetered,
+    )
+
+
+async def _ashared_create(kind, payload, kwargs, _settings, arequest):
+    if _coalesces(_settings) is False:
+        return await _acached_create(
+            kind, payload, kwargs, _settings, arequest
+        )
+    return await REQUEST_FLIGHTS.ado(
+        request_key(kind, payload, kwargs),
+        lambda: _acached_create(kind, payload, kwargs, _settings, arequest),
+        _unmetered,
+    )
+
+
+def _cached_create(kind, payload, kwargs, _settings, request):
+    """
+    perform an API request, serving it from / saving it to the response
+    cache named by the 'cache' setting, if any.
+    """
+    if (cache := get_response_cache(_settings.get("cache"))) is None:
+        return _governed(payload, kwargs, request)
+    key = request_key(kind, payload, kwargs)
+    if (hit := cache.get(key)) is not None:
+        return load_response(*hit)
+    response = _governed(payload, kwargs, request)
+    cache.put(key, kind, dump_response(response))
+    return response
+
+
+async def _acached_create(kind, payload, kwargs, _settings, arequest):
+    """
+    async version of _cached_create(). cache I/O happens in a worker thread.
+    """
+    if (cache := get_response_cache(_settings.get("cache"))) is None:
+        return await _agoverned(payload, kwargs, arequest)
+    key = request_key(kind, payload, kwargs)
+    if (hit := await to_thread(cache.get, key)) is not None:
+        return load_response(*hit)
+    response = await _agoverned(payload, kwargs, arequest)
+    await to_thread(cache.put, key, kind, dump_response(response))
+    return response
+
+
+def _prepare_completion(prompt, _settings):
     if isinstance(prompt, (list, tuple)):
         prompt = "\n".join(prompt)
-    response = client.completions.create(prompt=prompt,
-    **keyfilter(lambda k: k in EP_KWARGS["completions"], _settings))
-    return response, prompt
+    kwargs = keyfilter(lambda k: k in EP_KWARGS["completions"], _settings)
+    return prompt, kwargs
 
 
-def _call_openai_chat_completion(prompt, _settings):
+def _prepare_chat_completion(prompt, _settings):
     if isinstance(prompt, list):
         messages = prompt
-    elif (messages := _settings.get("message_context")) is None:
+    elif (context := _settings.get("message_context")) is None:
         messages = chatinit(prompt, _settings.get("system"))
     else:
-        messages = addmsg(prompt, messages)
+        if not isinstance(context, MessageContext):
+            context = MessageContext.from_settings(_settings, context)
+        # the prompt is always sent; the context makes room for it
+        messages = context.fit({"role": "user", "content": prompt})
     # permit people to use random additional kwargs and keys
     messages = [{'role': m['role'], 'content': m['content']} for m in messages]
     kwargs = keyfilter(lambda k: k in EP_KWARGS["chat-completions"], _settings)
+    return messages, kwargs
+
+
+def _call_openai_completion(prompt, _settings):
+    prompt, kwargs = _prepare_completion(prompt, _settings)
+    response = _create(
+        "completions",
+        prompt,
+        kwargs,
+        _settings,
+        lambda: get_client().completions.create(prompt=prompt, **kwargs)
+    )
+    return response, prompt
+
+
+def _call_openai_chat_completion(prompt, _settings):
+    messages, kwargs = _prepare_chat_completion(prompt, _settings)
+    if _settings.get("dry_run") is True:
+        return MockCompletion(messages, **kwargs), messages
+    response = _create(
+        "chat-completions",
+        messages,
+        kwargs,
+        _settings,
+        lambda: get_client().chat.completions.create(
+            messages=messages, **kwargs
+        )
+    )
+    return response, messages
+
+
+async def _acall_openai_completion(prompt, _settings):
+    prompt, kwargs = _prepare_completion(prompt, _settings)
+    response = await _acreate(
+        "completions",
+        prompt,
+        kwargs,
+        _settings,
+        lambda: get_async_client().completions.create(prompt=prompt, **kwargs)
+    )
+    return response, prompt
+
+
+async def _acall_openai_chat_completion(prompt, _settings):
+    messages, kwargs = _prepare_chat_completion(prompt, _settings)
     if _settings.get("dry_run") is True:
         return MockCompletion(messages, **kwargs), messages
-    response = client.chat.completions.create(messages=messages, **kwargs)
+    response = await _acreate(
+        "chat-completions",
+        messages,
+        kwargs,
+        _settings,
+        lambda: get_async_client().chat.completions.create(
+            messages=messages, **kwargs
+        )
+    )
     return response, messages
 
 
@@ -89,6 +326,168 @@ def complete(to_complete: Union[list[dict], str], _settings):
     return _call_openai_completion(to_complete, _settings)
 
 
+async def acomplete(to_complete: Union[list[dict], str], _settings):
+    """async version of complete(), using the AsyncOpenAI client"""
+    if _settings["model"] in CHAT_MODELS:
+        return await _acall_openai_chat_completion(to_complete, _settings)
+    return await _acall_openai_completion(to_complete, _settings)
+
+
+class CompletionStream:
+    """
+    iterable over the text of a streamed completion, as it arrives. once
+    the stream is exhausted or closed early, self.response holds a response
+    object assembled from it (usable with getchoice() and get_usage());
+    its finish_reason is None if the stream was cut off.
+    """
+
+    def __init__(self, to_complete: Union[list[dict], str], _settings):
+        self.settings = _settings
+        if _settings["model"] in CHAT_MODELS:
+            self.kind = "chat-completions"
+            self.prompt, self.kwargs = _prepare_chat_completion(
+                to_complete, _settings
+            )
+        else:
+            self.kind = "completions"
+            self.prompt, self.kwargs = _prepare_completion(
+                to_complete, _settings
+            )
+        self.chunks, self.finish_reason, self.usage = [], None, None
+        self.response, self._meta = None, {}
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def _request(self):
+        kwargs = self.kwargs | {
+            "stream": True, "stream_options": {"include_usage": True}
+        }
+        if self.kind == "chat-completions":
+            return get_client().chat.completions.create(
+                messages=self.prompt, **kwargs
+            )
+        return get_client().completions.create(
+            prompt=self.prompt, **kwargs
+        )
+
+    def _assemble(self):
+        choice = {"index": 0, "finish_reason": self.finish_reason or "stop"}
+        record = {
+            "id": self._meta.get("id", ""),
+            "created": self._meta.get("created", 0),
+            "model": self._meta.get("model", self.kwargs.get("model")),
+            "usage": self.usage,
+        }
+        if self.kind == "chat-completions":
+            from openai.types.chat import ChatCompletion
+
+            choice["message"] = {"role": "assistant", "content": self.text}
+            record |= {"object": "chat.completion", "choices": [choice]}
+            response = ChatCompletion.model_validate(record)
+        else:
+            from openai.types import Completion
+
+            choice |= {"text": self.text, "logprobs": None}
+            record |= {"object": "text_completion", "choices": [choice]}
+            response = Completion.model_validate(record)
+        # getchoice() treats anything but "stop" as truncation
+        response.choices[0].finish_reason = self.finish_reason
+        return response
+
+    def _consume(self, chunk):
+        if not self._meta:
+            self._meta = {
+                "id": chunk.id, "created": chunk.created, "model": chunk.model
+            }
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage.model_dump()
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        if choice.finish_reason is not None:
+            self.finish_reason = choice.finish_reason
+        if self.kind == "chat-completions":
+            return choice.delta.content
+        return choice.text
+
+    def __iter__(self):
+        if self.settings.get("dry_run") is True:
+            self.response = MockCompletion(self.prompt, **self.kwargs)
+            self.chunks.append("[mock message]")
+            yield "[mock message]"
+            return
+        cassette = get_cassette(self.settings.get("cassette"))
+        if cassette is not None:
+            found = cassette.find(self.kind, self.prompt, self.kwargs)
+            if found is not None:
+                self.response, seconds = found
+                if (delay := cassette.delay(seconds)) > 0:
+                    time.sleep(delay)
+                self.finish_reason = self.response.choices[0].finish_reason
+                self.chunks.append(getchoice(self.response, 0, False))
+                yield self.chunks[-1]
+                return
+            cassette.missed(self.kind, self.prompt)
+            start = time.perf_counter()
+        cache = get_response_cache(self.settings.get("cache"))
+        if cache is not None:
+            key = request_key(self.kind, self.prompt, self.kwargs)
+            if (hit := cache.get(key)) is not None:
+                self.response = load_response(*hit)
+                self.finish_reason = self.response.choices[0].finish_reason
+                self.chunks.append(getchoice(self.response, 0, False))
+                yield self.chunks[-1]
+                if cassette is not None:
+                    self._record(cassette, start)
+                return
+        ticket, limited = None, False
+        if _governor is not None:
+            model, tokens, cost = _governor.estimate(self.prompt, self.kwargs)
+            ticket = _governor.acquire(model, tokens, cost)
+        stream = None
+        try:
+            stream = self._request()
+            for chunk in stream:
+                if delta := self._consume(chunk):
+                    self.chunks.append(delta)
+                    yield delta
+        except Exception as exc:
+            limited = is_rate_limit_error(exc)
+            raise
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+            self.response = self._assemble()
+            if ticket is not None:
+                usage = None if self.usage is None else self.response.usage
+                _governor.release(ticket, usage, limited)
+        if (cache is not None) and (self.finish_reason is not None):
+            cache.put(key, self.kind, dump_response(self.response))
+        if (cassette is not None) and (self.finish_reason is not None):
+            self._record(cassette, start)
+
+    def _record(self, cassette, start):
+        cassette.record(
+            self.kind,
+            self.prompt,
+            self.kwargs,
+            self.response,
+            time.perf_counter() - start,
+        )
+
+
+def complete_stream(
+    to_complete: Union[list[dict], str], _settings
+) -> CompletionStream:
+    """
+    streaming version of complete(): returns an iterator over the text of
+    the response as it is generated.
+    """
+    return CompletionStream(to_complete, _settings)
+
+
 def chatinit(prompt=None, system=None) -> list[dict[str, str]]:
     messages = []
     for msg, role in zip((system, prompt), ("system", "user")):
@@ -116,7 +515,8 @@ def get_usage(history: Collection[Mapping]):
             event = event['response']
         elif 'content' in event.keys():
             event = event['content']
-        if not hasattr(event, 'usage'):
+        if getattr(event, 'usage', None) is None:
+            # e.g. a coalesced request, metered in the leader's response
             continue
         ptok += event.usage.prompt_tokens
         ctok += event.usage.completion_tokens
@@ -129,16 +529,25 @@ def get_cost(
     usage: Optional[Mapping] = None,
 ):
     """
-    get price of API calls. currently lazily assumes that all calls were made
-    to the same model.
+    get price of API calls. events in history are priced by the model that
+    answered them, if they record it, and otherwise as calls to model.
+    (antiscope.history.History.cost keeps a running total.)
     """
     if not xor((usage is None), (history is None)):
         raise TypeError("must pass exactly one of usage or history.")
+    if history is not None:
+        by_model = groupby(lambda e: e.get("model") or model, history)
+        costs = [
+            get_cost(m, usage=get_usage(events))
+            for m, events in by_model.items()
+        ]
+        return {
+            k: sum(c[k] for c in costs)
+            for k in ("prompt", "completion", "total")
+        }
     price = next(
         filter(lambda kv: model.startswith(kv[0]), PRICING.items())
     )[1]
-    if history is not None:
-        usage = get_usage(history)
     cost = {
         # prices given in PRICING are per 1000 tokens
         'prompt': usage['prompt'] * price['prompt'] / 1000,
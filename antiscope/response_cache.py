@@ -0,0 +1,231 @@
+"""
+persistent, multi-process-safe on-disk cache for API responses.
+
+responses are stored zlib-compressed in a SQLite database in WAL mode, so
+several processes on one host can read and write the same cache file
+concurrently.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Mapping, Optional, Union
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get(
+        "ANTISCOPE_CACHE_DIR", Path.home() / ".cache" / "antiscope"
+    )
+)
+DEFAULT_CACHE_PATH = DEFAULT_CACHE_DIR / "responses.sqlite3"
+# 256 MB of compressed payloads
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+# 30 days
+DEFAULT_TTL = 30 * 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed);
+"""
+
+
+def request_key(kind: str, payload: Any, kwargs: Mapping) -> str:
+    """
+    stable hash of an API request: the endpoint kind, the prompt or
+    normalized message list, and the (already-filtered) endpoint kwargs.
+    """
+    blob = json.dumps(
+        {"kind": kind, "payload": payload, "kwargs": dict(kwargs)},
+        sort_keys=True,
+        default=repr,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with TTL and total-size eviction.
+
+    connections are opened per thread and per process (so the cache
+    survives os.fork() in worker pools); WAL mode and a busy timeout let
+    concurrent writers queue instead of failing.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path, None] = None,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        ttl: Optional[float] = DEFAULT_TTL,
+        compresslevel: int = 6,
+        timeout: float = 30,
+    ):
+        self.path = Path(path) if path is not None else DEFAULT_CACHE_PATH
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compresslevel = compresslevel
+        self.timeout = timeout
+        self.hits, self.misses = 0, 0
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if (conn is not None) and (self._local.pid == os.getpid()):
+            return conn
+        conn = sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connect())
+
+    def _expired(self, created: float, now: float) -> bool:
+        return (self.ttl is not None) and (now - created > self.ttl)
+
+    def get(self, key: str) -> Optional[tuple[str, str]]:
+        """return (kind, serialized response) for key, or None on a miss"""
+        conn, now = self._connect(), time.time()
+        row = conn.execute(
+            "SELECT kind, payload, created FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        kind, payload, created = row
+        if self._expired(created, now):
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+        conn.execute(
+            "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+        )
+        self.hits += 1
+        return kind, zlib.decompress(payload).decode("utf-8")
+
+    def put(self, key: str, kind: str, text: str):
+        payload = zlib.compress(text.encode("utf-8"), self.compresslevel)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, kind, payload, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, payload, len(payload), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        if self.ttl is not None:
+            conn.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+            )
+        if self.max_bytes is None:
+            return
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # drop least-recently-used entries until we are back under budget
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ).fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def evict(self):
+        with self._transaction() as conn:
+            self._evict(conn, time.time())
+
+    def invalidate(self, key: str):
+        self._connect().execute(
+            "DELETE FROM responses WHERE key = ?", (key,)
+        )
+
+    def clear(self):
+        self._connect().execute("DELETE FROM responses")
+
+    def stats(self) -> dict[str, Union[int, float]]:
+        count, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return {
+            "entries": count, "bytes": size, "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def __len__(self):
+        return self.stats()["entries"]
+
+    def __reduce__(self):
+        # connections are per thread and process; reopen them on demand
+        return (
+            self.__class__,
+            (
+                self.path,
+                self.max_bytes,
+                self.ttl,
+                self.compresslevel,
+                self.timeout,
+            ),
+        )
+
+    def __repr__(self):
+        return f"ResponseCache({self.path})"
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolling back on error"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+_CACHES: dict[Path, ResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_response_cache(
+    spec: Union[ResponseCache, str, Path, bool, None]
+) -> Optional[ResponseCache]:
+    """
+    resolve the value of the 'cache' API setting to a ResponseCache (or
+    None, if caching is off). True means the default cache location; a str
+    or Path names a cache file. caches are shared by path within a process.
+    """
+    if isinstance(spec, ResponseCache):
+        return spec
+    if spec is None or spec is False:
+        return None
+    path = DEFAULT_CACHE_PATH if spec is True else Path(spec)
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = ResponseCache(path)
+        return _CACHES[path]
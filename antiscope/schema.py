@@ -0,0 +1,187 @@
+"""
+JSON schemas from type annotations, for structured (schema-constrained)
+evocation output, and decoding of structured responses back into values
+of the annotated type.
+
+responses are requested as a JSON object whose "result" field holds the
+return value, because the API requires the top level of a schema to be
+an object. schemas are for the API's strict mode, which supports only a
+subset of JSON schema: every object lists all its properties as required
+and allows no others, so dicts are encoded as arrays of {"key", "value"}
+entries and fixed-length tuples as objects with properties "0", "1", ...;
+types strict mode can't constrain (Any, untyped containers) have no
+schema. strict mode needs a model that supports it (see
+openai_settings.STRUCTURED_MODELS).
+"""
+import json
+import types
+from functools import lru_cache
+from typing import Any, Literal, Mapping, Union, get_args, get_origin
+
+from antiscope.openai_settings import CHAT_MODELS, STRUCTURED_MODELS
+
+RESULT_KEY = "result"
+PRIMITIVES = {
+    bool: {"type": "boolean"},
+    int: {"type": "integer"},
+    float: {"type": "number"},
+    str: {"type": "string"},
+    type(None): {"type": "null"},
+}
+UNION_TYPES = (Union, types.UnionType)
+
+
+class SchemaError(TypeError):
+    pass
+
+
+def supports_json_schema(model: str) -> bool:
+    """can model's responses be constrained by a strict-mode schema?"""
+    return (model in CHAT_MODELS) and model.startswith(STRUCTURED_MODELS)
+
+
+def strict_object(properties: Mapping[str, dict]) -> dict:
+    """schema of an object with exactly these (required) properties"""
+    return {
+        "type": "object",
+        "properties": dict(properties),
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def json_schema(annotation: Any) -> dict:
+    """
+    strict-mode JSON schema for values of the annotated type. supports
+    None, bool, int, float, str, and lists, tuples, sets, dicts, Unions
+    and Literals of those. raises SchemaError for anything else.
+    """
+    if annotation is None:
+        annotation = type(None)
+    if annotation in PRIMITIVES:
+        return dict(PRIMITIVES[annotation])
+    origin, args = get_origin(annotation), get_args(annotation)
+    if (annotation is Any) or (
+        annotation in (list, tuple, set, frozenset, dict)
+    ):
+        raise SchemaError(f"strict mode can't constrain {annotation}")
+    if origin in (list, set, frozenset):
+        return {"type": "array", "items": json_schema(args[0])}
+    if origin is tuple:
+        if (len(args) == 2) and (args[1] is Ellipsis):
+            return {"type": "array", "items": json_schema(args[0])}
+        return strict_object(
+            {str(i): json_schema(a) for i, a in enumerate(args)}
+        )
+    if origin is dict:
+        if args[0] not in (str, int, float):
+            raise SchemaError(f"can't represent {annotation} keys in JSON")
+        return {
+            "type": "array",
+            "items": strict_object(
+                {"key": json_schema(args[0]), "value": json_schema(args[1])}
+            ),
+        }
+    if origin in UNION_TYPES:
+        return {"anyOf": [json_schema(a) for a in args]}
+    if origin is Literal:
+        schema = {"enum": list(args)}
+        if len(kinds := {type(a) for a in args}) == 1:
+            schema |= PRIMITIVES.get(kinds.pop(), {})
+        return schema
+    raise SchemaError(f"no JSON schema for {annotation}")
+
+
+@lru_cache(maxsize=256)
+def _response_format(annotation: Any, name: str) -> Mapping:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": strict_object({RESULT_KEY: json_schema(annotation)}),
+        },
+    }
+
+
+def response_format(annotation: Any, name: str = "result") -> dict:
+    """
+    response_format API parameter constraining output to a JSON object
+    with a "result" field of the annotated type
+    """
+    try:
+        return _response_format(annotation, name)
+    except TypeError as te:
+        # unhashable annotation
+        if isinstance(te, SchemaError):
+            raise
+        return _response_format.__wrapped__(annotation, name)
+
+
+def _is_entries(value: Any) -> bool:
+    """is value a dict encoded as {"key", "value"} entries?"""
+    return isinstance(value, list) and all(
+        isinstance(e, dict) and (e.keys() == {"key", "value"}) for e in value
+    )
+
+
+def coerce(value: Any, annotation: Any) -> Any:
+    """convert a decoded JSON value to the annotated type, where possible"""
+    if annotation in (Any, None) or (value is None):
+        return value
+    if annotation is float and isinstance(value, int):
+        return float(value)
+    if annotation in (tuple, set, frozenset) and isinstance(value, list):
+        return annotation(value)
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin in (list, set, frozenset) and isinstance(value, list):
+        return origin(coerce(v, args[0]) for v in value)
+    if (origin is tuple) and isinstance(value, list):
+        if (len(args) == 2) and (args[1] is Ellipsis):
+            return tuple(coerce(v, args[0]) for v in value)
+        return tuple(coerce(v, a) for v, a in zip(value, args))
+    if (origin is tuple) and isinstance(value, dict):
+        return tuple(
+            coerce(value.get(str(i)), a) for i, a in enumerate(args)
+        )
+    if (origin is dict) and _is_entries(value):
+        value = {e["key"]: e["value"] for e in value}
+    if (origin is dict) and isinstance(value, dict):
+        keytype, valtype = args
+        return {
+            coerce(keytype(k) if keytype in (int, float) else k, keytype):
+            coerce(v, valtype)
+            for k, v in value.items()
+        }
+    if origin in UNION_TYPES:
+        # coerce to the first member of the union that matches the value
+        for member in args:
+            if _matches(value, member):
+                return coerce(value, member)
+    return value
+
+
+def _matches(value: Any, annotation: Any) -> bool:
+    if annotation is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if annotation is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    if isinstance(annotation, type):
+        return isinstance(value, annotation) or (
+            annotation in (tuple, set, frozenset) and isinstance(value, list)
+        )
+    origin = get_origin(annotation)
+    if origin is dict:
+        return isinstance(value, dict) or _is_entries(value)
+    if origin is tuple:
+        return isinstance(value, (list, dict))
+    if origin in (list, set, frozenset):
+        return isinstance(value, list)
+    if origin is Literal:
+        return value in get_args(annotation)
+    return True
+
+
+def decode(text: str, annotation: Any = Any) -> Any:
+    """decode a structured response (see response_format)"""
+    return coerce(json.loads(text)[RESULT_KEY], annotation)
@@ -0,0 +1,266 @@
+"""
+size-aware serialization of call arguments for evocation prompts.
+
+serializers are looked up by argument type (walking its MRO) in
+SERIALIZERS. keys may be types or fully-qualified type names, so that
+types from optional dependencies (numpy, pandas) can be handled without
+importing them. a serializer is called as serializer(obj, budget) and
+returns source-like text; budget is an approximate token allowance, or
+None for no limit. large objects are summarized within the budget: shape,
+dtype, length, leading and trailing items, and summary statistics.
+"""
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Optional, Union
+
+from antiscope.tokens import CHARS_PER_TOKEN
+
+Serializer = Callable[[Any, Optional[int]], str]
+# how many leading / trailing items to show from a summarized collection
+EDGE_ITEMS = 3
+# immutable scalar types, whose serializations can be memoized. (not
+# containers: equal containers may hold items of different types, e.g.
+# (1,) == (1.0,) == (True,), which the memo key wouldn't distinguish.)
+MEMOIZABLE = (str, bytes, int, float, complex, bool, type(None))
+# longest str / bytes whose serialization is memoized
+MEMOIZE_MAX_LENGTH = 4096
+
+
+def _chars(budget: Optional[int]) -> Optional[int]:
+    return None if budget is None else budget * CHARS_PER_TOKEN
+
+
+def _qualname(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def default_serializer(obj: Any, budget: Optional[int] = None) -> str:
+    text = repr(obj)
+    if not text.startswith("<"):
+        return truncate(text, budget)
+    if "__name__" in dir(obj):
+        return obj.__name__
+    raise TypeError(
+        f"the __repr__ method of {obj} is too ugly to pass to an evoked "
+        f"function. Give it a __name__ or a prettier __repr__ method."
+    )
+
+
+def truncate(text: str, budget: Optional[int]) -> str:
+    """elide the middle of text if it's longer than budget allows"""
+    if ((limit := _chars(budget)) is None) or (len(text) <= limit):
+        return text
+    keep = max(limit // 2, 1)
+    omitted = len(text) - 2 * keep
+    return f"{text[:keep]}...<{omitted} characters omitted>...{text[-keep:]}"
+
+
+def serialize_str(obj: str, budget: Optional[int] = None) -> str:
+    # triple quotes, so multiline strings read naturally in the prompt
+    return f'"""{truncate(obj, budget)}"""'
+
+
+BRACKETS = {
+    list: ("[", "]"),
+    tuple: ("(", ")"),
+    set: ("{", "}"),
+    frozenset: ("frozenset({", "})"),
+    dict: ("{", "}"),
+}
+
+
+def _item_budget(budget: Optional[int], n_items: int) -> Optional[int]:
+    if budget is None:
+        return None
+    return max(budget // max(n_items, 1), 1)
+
+
+def _serialize_item(obj: Any, budget: Optional[int]) -> str:
+    # triple quotes are for top-level str arguments; items are repr'd, as
+    # in the container's own repr
+    if isinstance(obj, (str, bytes)):
+        return default_serializer(obj, budget)
+    return serialize(obj, budget)
+
+
+def _serialize_items(obj, budget: Optional[int]) -> list[str]:
+    if isinstance(obj, dict):
+        return [
+            f"{_serialize_item(k, budget)}: {_serialize_item(v, budget)}"
+            for k, v in obj.items()
+        ]
+    return [_serialize_item(item, budget) for item in obj]
+
+
+def _edges(obj) -> tuple[list, str]:
+    """leading and trailing items of obj, and a description of its items"""
+    if isinstance(obj, dict):
+        keys = list(islice(obj, EDGE_ITEMS)) + list(obj)[-EDGE_ITEMS:]
+        return {k: obj[k] for k in keys}, "items"
+    if isinstance(obj, (set, frozenset)):
+        items = list(islice(obj, 2 * EDGE_ITEMS))
+    else:
+        items = list(obj[:EDGE_ITEMS]) + list(obj[-EDGE_ITEMS:])
+    names = sorted({type(item).__name__ for item in islice(obj, 1000)})
+    return items, " | ".join(names) if len(names) <= 3 else "mixed"
+
+
+def serialize_collection(
+    obj: Union[list, tuple, set, frozenset, dict],
+    budget: Optional[int] = None
+) -> str:
+    """
+    lists, tuples, sets and dicts. if the full serialization would exceed
+    budget, summarize as length, item types, and leading / trailing items.
+    """
+    if type(obj) not in BRACKETS:
+        # subclasses (namedtuples, defaultdicts...) have their own reprs
+        return default_serializer(obj, budget)
+    opener, closer = BRACKETS[type(obj)]
+    if (type(obj) is tuple) and (len(obj) == 1):
+        closer = ",)"
+    elif (len(obj) == 0) and isinstance(obj, (set, frozenset)):
+        return f"{type(obj).__name__}()"
+    chars = _chars(budget)
+    # every item takes at least 3 characters (incl. separator), so don't
+    # bother rendering collections that can't possibly fit
+    if (
+        (chars is None)
+        or (len(obj) <= 2 * EDGE_ITEMS)
+        or (3 * len(obj) <= chars)
+    ):
+        item_budget = _item_budget(budget, min(len(obj), 2 * EDGE_ITEMS))
+        text = opener + ", ".join(_serialize_items(obj, item_budget)) + closer
+        if (
+            (chars is None)
+            or (len(obj) <= 2 * EDGE_ITEMS)
+            or (len(text) <= chars)
+        ):
+            return text
+    edges, kinds = _edges(obj)
+    # leave some budget for the summary header
+    items = _serialize_items(edges, _item_budget(budget, 2 * EDGE_ITEMS + 2))
+    body = (
+        f"{opener}{', '.join(items[:EDGE_ITEMS])}, ..., "
+        f"{', '.join(items[EDGE_ITEMS:])}{closer}"
+    )
+    return f"<{type(obj).__name__} of {len(obj)} {kinds}: {body}>"
+
+
+def serialize_ndarray(obj, budget: Optional[int] = None) -> str:
+    import numpy as np
+
+    chars = _chars(budget)
+    if (chars is None) or (obj.size <= 2 * EDGE_ITEMS):
+        return repr(obj)
+    header = f"ndarray shape={obj.shape} dtype={obj.dtype}"
+    if (obj.dtype.kind in "iuf") and (obj.size > 0):
+        header += (
+            f" min={obj.min():.6g} max={obj.max():.6g} "
+            f"mean={obj.mean():.6g} std={obj.std():.6g}"
+        )
+    if obj.size == 0:
+        return f"<{header}>"
+    edgeitems = EDGE_ITEMS
+    while True:
+        body = np.array2string(
+            obj, threshold=2 * edgeitems, edgeitems=edgeitems, precision=6
+        )
+        if (len(header) + len(body) <= chars) or (edgeitems == 1):
+            break
+        edgeitems -= 1
+    return f"<{header}: {truncate(body, budget)}>"
+
+
+def _edge_rows(obj):
+    """first and last EDGE_ITEMS rows of a pandas object"""
+    return obj.iloc[list(range(EDGE_ITEMS)) + list(range(-EDGE_ITEMS, 0))]
+
+
+def serialize_dataframe(obj, budget: Optional[int] = None) -> str:
+    if _chars(budget) is None:
+        return repr(obj)
+    dtypes = ", ".join(f"{c}: {t}" for c, t in obj.dtypes.items())
+    header = f"DataFrame shape={obj.shape} columns={{{dtypes}}}"
+    if len(obj) <= 2 * EDGE_ITEMS:
+        body = obj.to_string(max_colwidth=40)
+    else:
+        # header line, leading rows, ..., trailing rows
+        lines = _edge_rows(obj).to_string(max_colwidth=40).split("\n")
+        body = "\n".join(
+            lines[:EDGE_ITEMS + 1] + ["..."] + lines[-EDGE_ITEMS:]
+        )
+    return f"<{header}:\n{truncate(body, budget)}\n>"
+
+
+def serialize_series(obj, budget: Optional[int] = None) -> str:
+    if (_chars(budget) is None) or (len(obj) <= 2 * EDGE_ITEMS):
+        return repr(obj)
+    header = f"Series name={obj.name!r} length={len(obj)} dtype={obj.dtype}"
+    if obj.dtype.kind in "iuf":
+        header += (
+            f" min={obj.min():.6g} max={obj.max():.6g} mean={obj.mean():.6g}"
+        )
+    lines = _edge_rows(obj).to_string().split("\n")
+    body = "\n".join(lines[:EDGE_ITEMS] + ["..."] + lines[EDGE_ITEMS:])
+    return f"<{header}:\n{truncate(body, budget)}\n>"
+
+
+SERIALIZERS: dict[Union[type, str], Serializer] = {
+    object: default_serializer,
+    str: serialize_str,
+    list: serialize_collection,
+    tuple: serialize_collection,
+    set: serialize_collection,
+    frozenset: serialize_collection,
+    dict: serialize_collection,
+    "numpy.ndarray": serialize_ndarray,
+    # (pandas sets __module__ to "pandas" on its public classes, but not in
+    # all versions)
+    "pandas.DataFrame": serialize_dataframe,
+    "pandas.core.frame.DataFrame": serialize_dataframe,
+    "pandas.Series": serialize_series,
+    "pandas.core.series.Series": serialize_series,
+}
+# resolved serializer per concrete type
+_DISPATCH: dict[type, Serializer] = {}
+
+
+def register_serializer(key: Union[type, str], serializer: Serializer):
+    """
+    serialize arguments of type key (a type or fully-qualified type name)
+    and its subclasses with serializer.
+    """
+    SERIALIZERS[key] = serializer
+    _DISPATCH.clear()
+    _memoized.cache_clear()
+
+
+def get_serializer(cls: type) -> Serializer:
+    if (serializer := _DISPATCH.get(cls)) is not None:
+        return serializer
+    for base in cls.__mro__:
+        serializer = SERIALIZERS.get(base, SERIALIZERS.get(_qualname(base)))
+        if serializer is not None:
+            break
+    _DISPATCH[cls] = serializer
+    return serializer
+
+
+@lru_cache(maxsize=1024)
+def _memoized(cls: type, obj: Any, budget: Optional[int]) -> str:
+    return get_serializer(cls)(obj, budget)
+
+
+def serialize(obj: Any, budget: Optional[int] = None) -> str:
+    """
+    source-like text for obj, summarized to fit roughly budget tokens
+    (if not None). serializations of immutable values are memoized.
+    """
+    cls = type(obj)
+    if (cls in MEMOIZABLE) and (
+        (cls not in (str, bytes)) or (len(obj) <= MEMOIZE_MAX_LENGTH)
+    ):
+        # (type is part of the key because e.g. 1 == 1.0 == True)
+        return _memoized(cls, obj, budget)
+    return get_serializer(cls)(obj, budget)
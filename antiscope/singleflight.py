@@ -0,0 +1,106 @@
+"""
+single-flight coalescing: concurrent callers asking for the same key share
+one execution of the underlying work instead of each doing it themselves.
+"""
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result, self.exception = None, None
+        self.followers = 0
+
+
+class _AFlight:
+    def __init__(self, task):
+        # the shared call runs in its own task, so that it outlives any
+        # one caller being cancelled
+        self.task, self.waiters = task, 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        # keyed by (event loop id, key)
+        self._aflights: dict[tuple, _AFlight] = {}
+        self.coalesced = 0
+
+    def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Any],
+        shared: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        call func() unless a call for key is already in flight, in which
+        case wait for that call and return its result (or raise its
+        exception). followers get shared(result) instead, if shared is
+        given.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if leader := (flight is None):
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+                self.coalesced += 1
+        if leader is False:
+            flight.done.wait()
+            if flight.exception is not None:
+                raise flight.exception
+            return flight.result if shared is None else shared(flight.result)
+        try:
+            flight.result = func()
+            return flight.result
+        except BaseException as exc:
+            flight.exception = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def ado(
+        self,
+        key: Hashable,
+        afunc: Callable[[], Awaitable[Any]],
+        shared: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        async version of do(). coalesces calls within one event loop. a
+        caller (leader or follower) that is cancelled cancels only itself;
+        the call is cancelled only when no one is left waiting for it.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        fkey = (id(loop), key)
+        if leader := ((flight := self._aflights.get(fkey)) is None):
+            flight = self._aflights[fkey] = _AFlight(
+                loop.create_task(afunc())
+            )
+            flight.task.add_done_callback(
+                lambda task: self._land(fkey, flight)
+            )
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if (flight.waiters == 0) and not flight.task.done():
+                # everyone waiting was cancelled
+                self._land(fkey, flight)
+                flight.task.cancel()
+        return result if (leader or (shared is None)) else shared(result)
+
+    def _land(self, fkey: tuple, flight: _AFlight):
+        if self._aflights.get(fkey) is flight:
+            del self._aflights[fkey]
+        if flight.task.done() and not flight.task.cancelled():
+            # mark retrieved, so the loop won't warn if no one awaited it
+            flight.task.exception()
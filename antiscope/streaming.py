@@ -0,0 +1,112 @@
+"""incremental parsing of sequence literals from streamed completions"""
+import re
+from typing import Optional
+
+OPENERS, CLOSERS = "([{", ")]}"
+# text that may precede the opening bracket of the sequence on its line
+SEQUENCE_PREFIX = re.compile(r"\s*((\w+\s*(:[^=]*)?=|return)\s*)?$")
+
+
+class SequenceStreamParser:
+    """
+    consumes the text of a response as it arrives and emits the source text
+    of each element of the first top-level list or tuple literal in it as
+    soon as the element is complete (i.e., on the following comma or on
+    the closing bracket). leading prose and code fences are skipped.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        # position of the sequence's opening bracket, once found
+        self.start: Optional[int] = None
+        self.element_start: Optional[int] = None
+        self.depth = 0
+        self.quote: Optional[str] = None
+        # start of the comment we are in, if any, and (start, end) spans
+        # of comments inside the sequence
+        self.comment: Optional[int] = None
+        self.comment_spans: list[tuple[int, int]] = []
+        self.closed = False
+        self.line_start = 0
+
+    @property
+    def found(self) -> bool:
+        return self.start is not None
+
+    def feed(self, chunk: str) -> list[str]:
+        """add chunk to the buffer; return any newly-completed elements"""
+        self.text += chunk
+        # hold back two characters so that triple quotes and escapes split
+        # across chunks are recognized
+        return self._scan(len(self.text) - 2)
+
+    def close(self) -> list[str]:
+        """
+        flush the buffer at the end of the stream. an unterminated final
+        element (e.g. from a truncated response) is returned as-is.
+        """
+        elements = self._scan(len(self.text))
+        if self.closed or (self.element_start is None):
+            return elements
+        if self.comment is not None:
+            self.comment_spans.append((self.comment, len(self.text)))
+            self.comment = None
+        self._emit(elements, len(self.text))
+        self.element_start = None
+        return elements
+
+    def _emit(self, elements: list[str], end: int):
+        pieces, cursor = [], self.element_start
+        for span_start, span_end in self.comment_spans:
+            if span_start >= cursor:
+                pieces.append(self.text[cursor:span_start])
+                cursor = span_end
+        self.comment_spans = []
+        element = "".join(pieces + [self.text[cursor:end]]).strip()
+        if element:
+            elements.append(element)
+        self.element_start = end + 1
+
+    def _scan(self, stop: int) -> list[str]:
+        elements, text = [], self.text
+        while (self.pos < stop) and not self.closed:
+            i, char = self.pos, text[self.pos]
+            self.pos += 1
+            if self.comment is not None:
+                if char == "\n":
+                    self.comment_spans.append((self.comment, i))
+                    self.line_start, self.comment = self.pos, None
+                continue
+            if (char == "\n") and (self.quote is None):
+                self.line_start = self.pos
+                continue
+            if self.quote is not None:
+                if char == "\\":
+                    self.pos += 1
+                elif text.startswith(self.quote, i):
+                    self.pos = i + len(self.quote)
+                    self.quote = None
+                continue
+            if self.start is None:
+                if (char in "[(") and SEQUENCE_PREFIX.match(
+                    text[self.line_start:i]
+                ):
+                    self.start, self.element_start, self.depth = i, i + 1, 1
+                continue
+            if char == "#":
+                self.comment = i
+            elif char in "'\"":
+                triple = char * 3
+                self.quote = triple if text.startswith(triple, i) else char
+                self.pos = i + len(self.quote)
+            elif char in OPENERS:
+                self.depth += 1
+            elif char in CLOSERS:
+                self.depth -= 1
+                if self.depth == 0:
+                    self._emit(elements, i)
+                    self.closed = True
+            elif (char == ",") and (self.depth == 1):
+                self._emit(elements, i)
+        return elements
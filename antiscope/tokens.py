@@ -0,0 +1,115 @@
+"""token counting and prompt token budgeting"""
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Mapping, Optional
+
+from antiscope.openai_settings import CHAT_MODELS, CONTEXT_WINDOWS
+
+# per-message framing overhead in chat prompts (role, separators), and the
+# tokens that prime the assistant's reply
+CHAT_MESSAGE_OVERHEAD = 4
+CHAT_REPLY_OVERHEAD = 3
+# rough average for English text and code, when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """
+    cached tiktoken encoding for model. returns None if tiktoken or the
+    encoding's data files are unavailable (e.g. offline).
+    """
+    try:
+        from tiktoken import encoding_for_model, get_encoding as _get
+
+        try:
+            return encoding_for_model(model)
+        except KeyError:
+            return _get("cl100k_base")
+    except (ImportError, KeyError, ValueError, OSError):
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    if (encoding := get_encoding(model)) is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: Iterable[Mapping], model: str) -> int:
+    total = CHAT_REPLY_OVERHEAD
+    for message in messages:
+        content = message["content"]
+        total += CHAT_MESSAGE_OVERHEAD + count_tokens(content, model)
+    return total
+
+
+def count_prompt_tokens(payload: Any, model: str) -> int:
+    """tokens in a prompt string or a list of chat messages"""
+    if isinstance(payload, (list, tuple)):
+        if all(isinstance(m, Mapping) for m in payload):
+            return count_message_tokens(payload, model)
+        payload = "\n".join(map(str, payload))
+    return count_tokens(str(payload), model)
+
+
+@lru_cache(maxsize=64)
+def context_window(model: str) -> Optional[int]:
+    """context size of model (longest matching prefix in CONTEXT_WINDOWS)"""
+    matches = [k for k in CONTEXT_WINDOWS if model.startswith(k)]
+    if not matches:
+        return None
+    return CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+@lru_cache(maxsize=64)
+def _system_overhead(system: str, model: str) -> int:
+    """tokens a system message adds to a chat prompt"""
+    return (
+        count_message_tokens([{"content": system}], model)
+        + CHAT_MESSAGE_OVERHEAD
+    )
+
+
+def plan_prompt(
+    candidates: Iterable[tuple[Mapping, Callable[[], str]]],
+    _settings: Mapping,
+) -> dict[str, Any]:
+    """
+    choose among alternative representations of a prompt. candidates are
+    (label, prompt-making function) pairs in order of preference; the first
+    whose whole prompt (including any system message) leaves room for
+    max_tokens of completion within the model's context window is chosen.
+    if none fit, the smallest is chosen. candidates after the chosen one are
+    not evaluated. a candidate whose function returns None is unavailable.
+
+    returns a dict describing the decision, including the chosen prompt.
+    """
+    model = _settings["model"]
+    window, max_tokens = context_window(model), _settings.get("max_tokens", 0)
+    available = None if window is None else window - max_tokens
+    overhead = 0
+    if (model in CHAT_MODELS) and (system := _settings.get("system")):
+        overhead = _system_overhead(system, model)
+    evaluated, chosen = [], None
+    for label, make_prompt in candidates:
+        if (prompt := make_prompt()) is None:
+            continue
+        tokens = count_tokens(prompt, model) + overhead
+        fits = (available is None) or (tokens <= available)
+        evaluated.append(dict(label) | {"tokens": tokens, "fits": fits})
+        if fits:
+            chosen = (evaluated[-1], prompt)
+            break
+        if (chosen is None) or (tokens < chosen[0]["tokens"]):
+            chosen = (evaluated[-1], prompt)
+    return {
+        "model": model,
+        "context_window": window,
+        "max_tokens": max_tokens,
+        "available": available,
+        "choice": chosen[0],
+        "prompt_tokens": chosen[0]["tokens"],
+        "fits": chosen[0]["fits"],
+        "candidates": evaluated,
+        "prompt": chosen[1],
+    }
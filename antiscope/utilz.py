@@ -1,15 +1,20 @@
 """generic functional/formatting utilities"""
 import ast
 import datetime as dt
+import importlib
+import linecache
 import re
+import sys
 import traceback
-from functools import wraps
+from functools import partial, wraps
 from inspect import getsource, getdoc, getcallargs, currentframe, getframeinfo
 from types import FunctionType, CodeType, FrameType
-from typing import Callable, Optional, Sequence
+from typing import Callable, Optional, Sequence, Union
 
 from cytoolz import nth
 
+from antiscope.codecache import CODE_CACHE
+
 EXPECTED_DECORATORS = ("@evoked", "@implied", "@denied", "@cache")
 
 
@@ -75,10 +80,18 @@ def dontcare(func, target=None):
     return carelessly
 
 
-def compile_source(source: str):
+def _compile_source(source: str):
     return get_codechild(compile(source, "", "exec"))
 
 
+def compile_source(
+    source: str, cache: bool = True, digest: Optional[str] = None
+):
+    if cache is False:
+        return _compile_source(source)
+    return CODE_CACHE.get(source, _compile_source, digest)
+
+
 def define(code: CodeType, globals_: Optional[dict] = None) -> FunctionType:
     globals_ = globals_ if globals_ is not None else globals()
     return FunctionType(code, globals_)
@@ -118,6 +131,44 @@ def exc_report(exc):
     }
 
 
+def compact_report(report: dict) -> dict:
+    """
+    picklable version of an exc_report() entry: the exception becomes its
+    repr, and functions (often dynamically defined) are dropped.
+    """
+    report = {k: v for k, v in report.items() if k != "func"}
+    if isinstance(report.get("exception"), BaseException):
+        report["exception"] = repr(report["exception"])
+    return report
+
+
+def globals_module(globals_: Optional[dict]) -> Optional[str]:
+    """name of the module whose namespace globals_ is, if it is one"""
+    if globals_ is None:
+        return None
+    module = sys.modules.get(globals_.get("__name__"))
+    if (module is None) or (module.__dict__ is not globals_):
+        return None
+    return module.__name__
+
+
+def module_globals(name: str) -> dict:
+    """namespace of the module named name, importing it if necessary"""
+    if (module := sys.modules.get(name)) is None:
+        module = importlib.import_module(name)
+    return module.__dict__
+
+
+async def to_thread(func, *args, **kwargs):
+    """
+    asyncio.to_thread(), importing asyncio only when it is needed (it
+    always already is, if we are running in an event loop).
+    """
+    import asyncio
+
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
 def tabtext(text, tabsize=4):
     tab = " " * tabsize
     return tab + re.sub("\n", f"\n{tab}", text)
@@ -127,8 +178,57 @@ def argformat_docstring(func: FunctionType, *args, **kwargs) -> str:
     return getdoc(func).format(**getcallargs(func, *args, **kwargs))
 
 
-def capture_call() -> str:
-    return parse_call_from_source(*get_call_source(currentframe().f_back))
+# parsed call sites: (filename, line number) -> (code object, source of the
+# call or the exception raised trying to find it)
+CALL_SITES: dict[tuple[str, int], tuple[CodeType, Union[str, Exception]]] = {}
+CALL_SITES_MAXSIZE = 4096
+
+
+def capture_call(lazy: bool = False) -> Union[str, Callable[[], str]]:
+    """
+    source of the call expression in which our caller was called. if lazy,
+    return a function that finds (and caches) it on demand instead.
+    """
+    frame = currentframe().f_back.f_back
+    code, lineno, globals_ = frame.f_code, frame.f_lineno, frame.f_globals
+    del frame
+    if lazy is True:
+        return partial(call_site_source, code, lineno, globals_)
+    return call_site_source(code, lineno, globals_)
+
+
+def call_site_source(code: CodeType, lineno: int, globals_: dict) -> str:
+    """source of the call on line lineno of code, cached by call site"""
+    key = (code.co_filename, lineno)
+    cached = CALL_SITES.get(key)
+    # a different code object on the same line means the file was reloaded
+    if (cached is None) or (cached[0] is not code):
+        try:
+            result = parse_call_from_source(
+                *get_site_source(code.co_filename, lineno, globals_)
+            )
+        except (ValueError, SyntaxError) as ex:
+            result = ex
+        if len(CALL_SITES) >= CALL_SITES_MAXSIZE:
+            CALL_SITES.clear()
+        cached = CALL_SITES[key] = (code, result)
+    if isinstance(cached[1], Exception):
+        raise type(cached[1])(*cached[1].args)
+    return cached[1]
+
+
+def get_site_source(
+    filename: str, lineno: int, globals_: dict, maxlines: int = 25
+) -> tuple[str, str]:
+    """
+    the line lineno of filename and maxlines of context around it (as
+    inspect.getframeinfo would give them)
+    """
+    lines = linecache.getlines(filename, globals_)
+    if not 0 < lineno <= len(lines):
+        raise ValueError("Couldn't get source for call site.")
+    start = max(0, min(lineno - 1 - maxlines // 2, len(lines) - maxlines))
+    return lines[lineno - 1], "".join(lines[start:start + maxlines])
 
 
 def get_call_source(frame: FrameType, maxlines: int = 25) -> tuple[str, str]:
@@ -0,0 +1,262 @@
+"""
+example-based validation of implied functions.
+
+candidate sources are executed against example inputs (args_like) and,
+if given, expected outputs (return_like) in separate Python subprocesses,
+one per candidate, run in parallel. each subprocess has a wall-clock
+timeout and CPU time / address space limits (where the resource module
+exists), so that a candidate that hangs, allocates without bound or
+crashes the interpreter just fails validation.
+
+validation latency and pass rates are tallied per function name in
+VALIDATION_STATS (see validation_report()).
+"""
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Mapping, Optional, Sequence
+
+# seconds per candidate (covering all examples)
+VALIDATION_TIMEOUT = 5
+# bytes of address space per candidate process
+VALIDATION_MEMORY = 1024 * 2 ** 20
+# at most this many candidate processes at once
+VALIDATION_WORKERS = min(os.cpu_count() or 1, 8)
+
+# runs in the subprocess: reads a pickled job from stdin and writes a JSON
+# message ({"results": [...]}, {"error": ...} or {"unusable": ...}) to a
+# duplicate of the original stdout. fds 1 and 2 are pointed at /dev/null
+# before the candidate runs, so nothing it prints can be mistaken for the
+# message; the parent parses the message as untrusted data.
+WORKER = """
+import json, os, pickle, sys, types
+out = os.fdopen(os.dup(1), "w")
+devnull = os.open(os.devnull, os.O_WRONLY)
+os.dup2(devnull, 1)
+os.dup2(devnull, 2)
+def send(message):
+    json.dump(message, out)
+    out.flush()
+    os._exit(0)
+try:
+    job = pickle.load(sys.stdin.buffer)
+except Exception as ex:
+    send({"unusable": repr(ex)[:200]})
+try:
+    import resource
+    memory, cpu = job["memory"], job["cpu"]
+    if memory is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+except (ImportError, ValueError, OSError):
+    pass
+try:
+    namespace = {"__name__": "__validation__"}
+    exec(job["source"], namespace)
+    funcs = [
+        v for v in namespace.values() if isinstance(v, types.FunctionType)
+    ]
+    func = namespace.get(job["name"], funcs[-1] if funcs else None)
+    results = []
+    for example in job["examples"]:
+        try:
+            value = func(*example["args"])
+        except Exception as ex:
+            results.append({"ok": False, "error": repr(ex)[:200]})
+            continue
+        if "expected" not in example:
+            results.append({"ok": True})
+            continue
+        try:
+            ok = bool(value == example["expected"])
+        except Exception:
+            ok = repr(value) == repr(example["expected"])
+        results.append({"ok": ok, "value": repr(value)[:200]})
+except BaseException as ex:
+    send({"error": repr(ex)[:200]})
+send({"results": results})
+"""
+
+# function name -> tallies of validation runs
+VALIDATION_STATS: dict[str, dict[str, float]] = {}
+_STATS_LOCK = threading.Lock()
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def validation_examples(
+    args_like: Any, return_like: Any = None
+) -> Optional[list[dict[str, Any]]]:
+    """
+    examples ({"args": tuple, "expected": value} dicts; "expected" only if
+    return_like is given) from args_like / return_like, or None if they
+    aren't usable as examples (e.g. they are prose). each element of
+    args_like is a tuple of positional arguments or a single argument.
+    """
+    if (args_like is None) or isinstance(args_like, str):
+        return None
+    args_like = [a if isinstance(a, tuple) else (a,) for a in args_like]
+    if (return_like is None) or isinstance(return_like, str):
+        return [{"args": args} for args in args_like]
+    return_like = list(return_like)
+    if len(return_like) != len(args_like):
+        return None
+    return [
+        {"args": args, "expected": expected}
+        for args, expected in zip(args_like, return_like)
+    ]
+
+
+def _parse_message(out: bytes, count: int) -> dict[str, Any]:
+    """
+    the worker's message, checked: per-example results (count of them) or
+    an error. anything malformed is an error.
+    """
+    try:
+        message = json.loads(out)
+    except ValueError:
+        return {"error": "malformed validation output"}
+    if not isinstance(message, dict):
+        return {"error": "malformed validation output"}
+    for key in ("error", "unusable"):
+        if key in message:
+            return {key: str(message[key])[:200]}
+    results = message.get("results")
+    if (
+        (not isinstance(results, list))
+        or (len(results) != count)
+        or not all(
+            isinstance(r, dict) and isinstance(r.get("ok"), bool)
+            for r in results
+        )
+    ):
+        return {"error": "malformed validation results"}
+    return {
+        "results": [
+            {"ok": r["ok"]}
+            | {k: str(r[k])[:200] for k in ("error", "value") if k in r}
+            for r in results
+        ]
+    }
+
+
+def _run_candidate(
+    source: str,
+    name: Optional[str],
+    examples: Sequence[Mapping[str, Any]],
+    timeout: float,
+    memory: Optional[int],
+) -> dict[str, Any]:
+    job = {
+        "source": source,
+        "name": name,
+        "examples": examples,
+        "memory": memory,
+        "cpu": max(int(timeout) + 1, 1),
+    }
+    report = {
+        "source": source,
+        "passed": False,
+        "unusable": False,
+        "error": None,
+        "results": [],
+    }
+    start = time.perf_counter()
+    try:
+        payload = pickle.dumps(job)
+    except (pickle.PicklingError, TypeError, AttributeError) as ex:
+        report["error"] = f"examples unusable: not picklable: {ex!r}"
+        return report | {"unusable": True, "seconds": 0}
+    proc = subprocess.Popen(
+        [sys.executable, "-c", WORKER],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        out, _ = proc.communicate(payload, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        report["error"] = f"timed out after {timeout} seconds"
+        return report | {"seconds": time.perf_counter() - start}
+    report["seconds"] = time.perf_counter() - start
+    if proc.returncode != 0:
+        report["error"] = f"exit status {proc.returncode}"
+        return report
+    message = _parse_message(out, len(examples))
+    if "unusable" in message:
+        report["error"] = f"examples unusable: {message['unusable']}"
+        return report | {"unusable": True}
+    if "error" in message:
+        report["error"] = message["error"]
+        return report
+    report["results"] = message["results"]
+    report["passed"] = all(r["ok"] for r in report["results"])
+    if report["passed"] is False:
+        failure = next(r for r in report["results"] if not r["ok"])
+        if (error := failure.get("error")) is None:
+            error = f"returned {failure.get('value')}"
+        report["error"] = error
+    return report
+
+
+def _tally(name: Optional[str], reports: Sequence[Mapping]):
+    with _STATS_LOCK:
+        stats = VALIDATION_STATS.setdefault(
+            name or "<anonymous>",
+            {"runs": 0, "candidates": 0, "passed": 0, "seconds": 0.0},
+        )
+        stats["runs"] += 1
+        stats["candidates"] += len(reports)
+        stats["passed"] += sum(r["passed"] for r in reports)
+        stats["seconds"] += sum(r["seconds"] for r in reports)
+
+
+def validate(
+    sources: Sequence[str],
+    examples: Sequence[Mapping[str, Any]],
+    name: Optional[str] = None,
+    timeout: float = VALIDATION_TIMEOUT,
+    memory: Optional[int] = VALIDATION_MEMORY,
+) -> list[dict[str, Any]]:
+    """
+    run each of sources against examples (see validation_examples()) in
+    parallel subprocesses. returns a report per source: whether it
+    passed, the per-example results, the first error, and the time taken.
+    if the examples can't be loaded in a subprocess (e.g. they are
+    instances of classes defined in __main__), the report is marked
+    "unusable", and says nothing about the source.
+    name is the name of the function to call (by default, the last one
+    the source defines).
+    """
+    with ThreadPoolExecutor(min(len(sources), VALIDATION_WORKERS)) as pool:
+        reports = list(
+            pool.map(
+                lambda s: _run_candidate(s, name, examples, timeout, memory),
+                sources,
+            )
+        )
+    # examples the subprocesses can't load say nothing about the candidates
+    if usable := [r for r in reports if not r["unusable"]]:
+        _tally(name, usable)
+    return reports
+
+
+def validation_report() -> dict[str, dict[str, float]]:
+    """pass rate and mean latency of candidate validation, per function"""
+    with _STATS_LOCK:
+        return {
+            name: stats | {
+                "pass_rate": stats["passed"] / max(stats["candidates"], 1),
+                "mean_seconds": stats["seconds"] / max(stats["candidates"], 1),
+            }
+            for name, stats in VALIDATION_STATS.items()
+        }
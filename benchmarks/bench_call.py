@@ -0,0 +1,73 @@
+"""
+call-overhead microbenchmark for loaded Dynamic / Irrealis functions.
+
+times calls to a trivial function made directly and through Dynamic and
+OAIrrealis objects (optional and not), and reports per-call time and the
+ratio to the direct call. no API requests are made.
+
+usage: python benchmarks/bench_call.py [--number N] [--repeat R]
+    [--max-ratio X]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from antiscope.dynamic import Dynamic  # noqa: E402
+from antiscope.evocation import OAIrrealis  # noqa: E402
+
+SOURCE = "def f(x):\n    return x + 1"
+
+
+def plain(x):
+    return x + 1
+
+
+def targets() -> dict:
+    return {
+        "plain function": plain,
+        "Dynamic": Dynamic(SOURCE),
+        "Dynamic (optional)": Dynamic(SOURCE, optional=True),
+        "OAIrrealis": OAIrrealis(SOURCE, lazy=False),
+        "OAIrrealis (optional)": OAIrrealis(
+            SOURCE, lazy=False, optional=True
+        ),
+    }
+
+
+def time_call(func, number: int, repeat: int) -> float:
+    """best-of-repeat seconds per call"""
+    timer = timeit.Timer("func(1)", globals={"func": func})
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=None,
+        help="fail if any wrapper costs more than this multiple of a direct "
+        "call"
+    )
+    args = parser.parse_args(argv)
+    timings = {
+        name: time_call(func, args.number, args.repeat)
+        for name, func in targets().items()
+    }
+    baseline, failed = timings["plain function"], False
+    for name, seconds in timings.items():
+        ratio = seconds / baseline
+        status = ""
+        if (args.max_ratio is not None) and (ratio > args.max_ratio):
+            status, failed = "  OVER", True
+        print(f"{name:>24}: {seconds * 1e9:7.1f} ns  x{ratio:.2f}{status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
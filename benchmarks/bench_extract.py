@@ -0,0 +1,77 @@
+"""
+response-processing benchmark: the single-pass extractor
+(EVOCATION_PIPELINE) against the literalizer retry ladder
+(LITERALIZER_PIPELINE), over the responses in benchmarks/corpus.py.
+
+reports, per pipeline, how many responses were parsed to the expected
+value and how long the strip and parse steps took.
+
+usage: python benchmarks/bench_extract.py [--repeat R]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from antiscope.evocation import (  # noqa: E402
+    EVOCATION_PIPELINE, LITERALIZER_PIPELINE
+)
+from corpus import CORPUS  # noqa: E402
+
+PIPELINES = {
+    "extract": EVOCATION_PIPELINE,
+    "literalizer": LITERALIZER_PIPELINE,
+}
+
+
+def run_case(pipeline, response: str):
+    """parsed value (or exception) and best-of seconds, steps after choose"""
+    result = response
+    for name, step in pipeline.items():
+        if name == "choose":
+            continue
+        result = step(result)
+    return result
+
+
+def time_case(pipeline, response: str, repeat: int):
+    best, outcome = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            outcome = run_case(pipeline, response)
+        except Exception as exc:
+            outcome = exc
+        best = min(best, time.perf_counter() - start)
+    return outcome, best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    totals = {name: {"correct": 0, "seconds": 0.0} for name in PIPELINES}
+    print(f"{'case':>32}" + "".join(f"{n:>22}" for n in PIPELINES))
+    for case in CORPUS:
+        row = f"{case['name']:>32}"
+        for name, pipeline in PIPELINES.items():
+            outcome, seconds = time_case(
+                pipeline, case["response"], args.repeat
+            )
+            ok = outcome == case["expected"]
+            totals[name]["correct"] += ok
+            totals[name]["seconds"] += seconds
+            row += f"{seconds * 1000:>15.3f} ms {'ok' if ok else '--':>4}"
+        print(row)
+    for name, total in totals.items():
+        print(
+            f"{name}: {total['correct']}/{len(CORPUS)} correct, "
+            f"{total['seconds'] * 1000:.1f} ms total"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+corpus of model responses for response-processing benchmarks.
+
+each case is a dict with a name, the response text, and the value that
+the evocation pipeline should extract from it. the corpus mixes the
+shapes we see in practice (bare literals, fenced code, prose around code,
+interpreter transcripts, assignments, truncated output) with a few large
+responses.
+"""
+import random
+
+
+def _large_list(n: int) -> list:
+    rng = random.Random(n)
+    return [
+        {"id": i, "name": f"item {i}", "score": round(rng.random(), 4)}
+        for i in range(n)
+    ]
+
+
+def _cases() -> list[dict]:
+    cases = [
+        {"name": "bare int", "response": "42", "expected": 42},
+        {"name": "bare list", "response": "[1, 2, 3]", "expected": [1, 2, 3]},
+        {
+            "name": "fenced",
+            "response": "```python\n['a', 'b']\n```",
+            "expected": ["a", "b"],
+        },
+        {
+            "name": "prose around fence",
+            "response": (
+                "Sure! Here's what it might return:\n\n```python\n"
+                "{'city': 'Lisbon', 'population': 545923}\n```\n\n"
+                "Let me know if you'd like anything else."
+            ),
+            "expected": {"city": "Lisbon", "population": 545923},
+        },
+        {
+            "name": "assignment",
+            "response": "```python\nresult = (1.5, 2.5)\n```",
+            "expected": (1.5, 2.5),
+        },
+        {
+            "name": "interpreter transcript",
+            "response": ">>> f(3)\n9",
+            "expected": 9,
+        },
+        {
+            "name": "print then value",
+            "response": "```python\nprint('computing')\n[True, False]\n```",
+            "expected": [True, False],
+        },
+        {
+            "name": "multiline literal",
+            "response": (
+                "```python\nnames = [\n    'alpha',\n    'beta',  # second\n"
+                "    'gamma',\n]\n```"
+            ),
+            "expected": ["alpha", "beta", "gamma"],
+        },
+        {
+            "name": "quoted scalar",
+            "response": "`3.14`.",
+            "expected": 3.14,
+        },
+        {
+            "name": "string with brackets",
+            "response": "```python\n'a [weird) string'\n```",
+            "expected": "a [weird) string",
+        },
+        {
+            "name": "truncated list",
+            "response": "```python\n['one', 'two', 'thr",
+            "expected": ["one", "two"],
+        },
+        {
+            "name": "truncated string in dict",
+            "response": '{"a": 1, "b": "hel',
+            "expected": {"a": 1},
+        },
+        {
+            "name": "truncated string at line end",
+            "response": "['x', 'y\n",
+            "expected": ["x"],
+        },
+        {
+            "name": "truncated dict",
+            "response": "{'a': 1, 'b': [2, 3], 'c':",
+            "expected": {"a": 1, "b": [2, 3]},
+        },
+    ]
+    for n in (1_000, 10_000):
+        value = _large_list(n)
+        cases.append(
+            {
+                "name": f"large list ({n})",
+                "response": (
+                    f"Here you go:\n```python\nresult = {value!r}\n```"
+                ),
+                "expected": value,
+            }
+        )
+        cases.append(
+            {
+                "name": f"large multiline list ({n})",
+                "response": (
+                    "```python\n[\n"
+                    + "".join(f"    {v!r},\n" for v in value)
+                    + "]\n```"
+                ),
+                "expected": value,
+            }
+        )
+    return cases
+
+
+CORPUS = _cases()
+
+
+# responses to function definition requests, for reconstruct_def
+DEFINITIONS = [
+    {
+        "name": "bare def",
+        "defstem": "def slugify(text: str) -> str:",
+        "response": (
+            "def slugify(text: str) -> str:\n"
+            "    import re\n"
+            "    text = re.sub(r'[^a-z0-9]+', '-', text.lower())\n"
+            "    return text.strip('-')\n"
+        ),
+    },
+    {
+        "name": "fenced def with prose",
+        "defstem": "def mean(values: list[float]) -> float:",
+        "response": (
+            "Here's one way to write it:\n\n```python\n"
+            "def mean(values: list[float]) -> float:\n"
+            '    """arithmetic mean of values"""\n'
+            "    if not values:\n"
+            "        raise ValueError('no values')\n"
+            "    return sum(values) / len(values)\n```\n\n"
+            "This raises on empty input."
+        ),
+    },
+    {
+        "name": "body only",
+        "defstem": "def clamp(x: int, lo: int, hi: int) -> int:",
+        "response": "```python\n    return max(lo, min(x, hi))\n```",
+    },
+]
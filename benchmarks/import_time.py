@@ -0,0 +1,97 @@
+"""
+cold-import regression benchmark for antiscope.
+
+imports antiscope modules in fresh interpreters under `python -X importtime`,
+and fails if the median cumulative import time exceeds the budget or if any
+of the heavy dependencies that should only load on first use (the OpenAI
+SDK, tiktoken, rich) are imported.
+
+usage: python benchmarks/import_time.py [--budget-ms MS] [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+MODULES = ("antiscope.evocation", "antiscope.conversation")
+LAZY_DEPENDENCIES = ("openai", "tiktoken", "rich")
+# milliseconds; cold import of the OpenAI SDK alone is several times this
+DEFAULT_BUDGET_MS = 120
+REPO_ROOT = Path(__file__).parents[1]
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """map module name -> cumulative import time (us)"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            # header line
+            continue
+    return times
+
+
+def measure(module: Optional[str]) -> dict[str, int]:
+    env = os.environ | {
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, (str(REPO_ROOT), os.environ.get("PYTHONPATH")))
+        ),
+        # don't let stale bytecode or a warm cache hide anything
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import {module}" if module is not None else "pass",
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+    # modules the interpreter imports at startup regardless
+    startup = set(measure(None))
+    failed = False
+    for module in MODULES:
+        runs = [measure(module) for _ in range(args.runs)]
+        median_ms = statistics.median(r[module] for r in runs) / 1000
+        heavy = sorted(
+            name for name in runs[0]
+            if name.split(".")[0] in LAZY_DEPENDENCIES
+        )
+        status = "ok"
+        if median_ms > args.budget_ms:
+            status, failed = f"OVER BUDGET ({args.budget_ms} ms)", True
+        print(f"{module}: {median_ms:.1f} ms median of {args.runs}: {status}")
+        if heavy:
+            failed = True
+            print(f"  eagerly imported: {', '.join(heavy[:10])}")
+        slowest = sorted(
+            filter(lambda kv: kv[0] not in startup, runs[0].items()),
+            key=lambda kv: -kv[1]
+        )[1:6]
+        for name, us in slowest:
+            print(f"  {name}: {us / 1000:.1f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
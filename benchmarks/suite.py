@@ -0,0 +1,366 @@
+"""
+microbenchmark suite for the local (no API) hot paths of antiscope.
+
+each benchmark times one operation over canned inputs (see corpus.py)
+and reports the best-of-repeat time per operation. results can be saved,
+tagged with the current git commit, to a JSONL file (--save), so they are
+tracked across commits. each run is compared against a stored baseline
+(by default, the most recent result from another commit); a benchmark
+slower than the baseline by more than its tolerance is a regression, and
+the run fails.
+
+usage: python benchmarks/suite.py [--filter PATTERN] [--repeat R]
+    [--save] [--results PATH] [--baseline COMMIT] [--tolerance X]
+"""
+import argparse
+import datetime as dt
+import json
+import linecache
+import platform
+import re
+import subprocess
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).parents[1]))
+
+from antiscope.artifacts import artifacts  # noqa: E402
+from antiscope.dynamic import Dynamic  # noqa: E402
+from antiscope.evocation import (  # noqa: E402
+    OAImplication, format_calltext, literalizer, reconstruct_def
+)
+from antiscope.history import History  # noqa: E402
+from antiscope.irrealis import ImplicationWrapper  # noqa: E402
+from antiscope.openai_utils import get_usage, strip_codeblock  # noqa: E402
+from antiscope.utilz import capture_call, digsource, getdef  # noqa: E402
+from corpus import CORPUS, DEFINITIONS  # noqa: E402
+
+REPO_ROOT = Path(__file__).parents[1]
+DEFAULT_RESULTS = Path(__file__).parent / "results.jsonl"
+# fail if a benchmark takes more than this multiple of its baseline time
+DEFAULT_TOLERANCE = 1.3
+# for operations of a few microseconds or less, whose timings are noisier
+NOISY_TOLERANCE = 1.6
+# (at least) seconds per timing repetition
+MIN_SECONDS = 0.05
+HISTORY_EVENTS = 10_000
+
+# name -> (setup returning the operation to time, tolerance or None)
+BENCHMARKS: dict[str, tuple[Callable[[], Callable[[], Any]], Any]] = {}
+
+
+def benchmark(name: str, tolerance: Optional[float] = None):
+    """register a setup function returning a zero-argument operation"""
+    def register(setup):
+        BENCHMARKS[name] = (setup, tolerance)
+        return setup
+
+    return register
+
+
+def _strippable(response: str) -> bool:
+    try:
+        strip_codeblock(response)
+        return True
+    except (AttributeError, IndexError):
+        # e.g. unterminated fences
+        return False
+
+
+def _small_cases() -> list[dict]:
+    # the 10,000-element cases would swamp everything else; the rest, if
+    # strip_codeblock handles them
+    return [
+        c for c in CORPUS
+        if ("10000" not in c["name"]) and _strippable(c["response"])
+    ]
+
+
+def _chat_response(content: str, finish_reason: str = "stop"):
+    message = SimpleNamespace(role="assistant", content=content)
+    choice = SimpleNamespace(
+        index=0, finish_reason=finish_reason, message=message
+    )
+    usage = SimpleNamespace(
+        prompt_tokens=120, completion_tokens=40, total_tokens=160
+    )
+    return SimpleNamespace(
+        model="gpt-3.5-turbo", choices=[choice], usage=usage
+    )
+
+
+def summarize_scores(
+    scores: dict[str, float], names: list[str], limit: int = 5
+) -> list[str]:
+    """the names with the highest scores, at most limit of them"""
+    # sorted by score, ties broken by name
+    return sorted(names, key=lambda n: (-scores.get(n, 0), n))[:limit]
+
+
+@benchmark("strip_codeblock (corpus)")
+def _strip_codeblock():
+    responses = [c["response"] for c in _small_cases()]
+
+    def run():
+        for response in responses:
+            strip_codeblock(response)
+
+    return run
+
+
+@benchmark("literalizer (corpus)")
+def _literalizer():
+    texts = [strip_codeblock(c["response"]) for c in _small_cases()]
+
+    def run():
+        for text in texts:
+            try:
+                literalizer(text)
+            except (SyntaxError, ValueError, IndexError):
+                pass
+
+    return run
+
+
+@benchmark("reconstruct_def (definitions)")
+def _reconstruct_def():
+    cases = [
+        (_chat_response(c["response"]), c["defstem"]) for c in DEFINITIONS
+    ]
+
+    def run():
+        for response, defstem in cases:
+            reconstruct_def(response, defstem)
+
+    return run
+
+
+@benchmark("format_calltext")
+def _format_calltext():
+    scores = {f"name {i}": i / 7 for i in range(40)}
+    names = list(scores)[::-1]
+    return lambda: format_calltext(
+        summarize_scores, scores, names, limit=3, _budget=256
+    )
+
+
+# a call site whose surrounding lines parse on their own, as at the top
+# level of a script or notebook cell
+CALL_SITE = """
+def caller():
+    return callee([1, 2, 3], key="value")
+"""
+
+
+@benchmark("capture_call (cached site)", tolerance=NOISY_TOLERANCE)
+def _capture_call():
+    filename = "<benchmark call site>"
+    linecache.cache[filename] = (
+        len(CALL_SITE), None, CALL_SITE.splitlines(True), filename
+    )
+    # as an OAIrrealis does when called
+    namespace = {"callee": lambda *args, **kwargs: capture_call()}
+    exec(compile(CALL_SITE, filename, "exec"), namespace)
+    return namespace["caller"]
+
+
+@benchmark("getdef")
+def _getdef():
+    return lambda: getdef(summarize_scores)
+
+
+@benchmark("digsource")
+def _digsource():
+    return lambda: digsource(summarize_scores)
+
+
+@benchmark("artifacts().definition", tolerance=NOISY_TOLERANCE)
+def _artifacts():
+    return lambda: artifacts(summarize_scores).definition
+
+
+SOURCE = "def f(x):\n    return x + 1"
+
+
+@benchmark("Dynamic load (cached code)")
+def _dynamic_load():
+    return lambda: Dynamic(SOURCE)
+
+
+@benchmark("Dynamic call", tolerance=NOISY_TOLERANCE)
+def _dynamic_call():
+    dynamic = Dynamic(SOURCE)
+    return lambda: dynamic(1)
+
+
+class CannedImplication(OAImplication):
+    def imply(self) -> str:
+        return "{'alpha': 1, 'beta': [2, 3], 'gamma': {'delta': 4}}"
+
+
+class CannedImplicationWrapper(ImplicationWrapper):
+    _constructor = CannedImplication
+
+
+@benchmark("ImplicationWrapper attribute access")
+def _wrapper_getattr():
+    wrapper = CannedImplicationWrapper("a small mapping", dict)
+    # loads on first access
+    wrapper.get
+    return lambda: wrapper.get
+
+
+def _history() -> History:
+    history = History(maxlen=None)
+    for i in range(HISTORY_EVENTS):
+        history.record("evoke", f"prompt {i}", _chat_response(f"{i}"))
+    return history
+
+
+@benchmark(f"get_usage ({HISTORY_EVENTS} events)")
+def _get_usage():
+    history = _history()
+    return lambda: get_usage(history)
+
+
+@benchmark(
+    f"History.usage ({HISTORY_EVENTS} events)", tolerance=NOISY_TOLERANCE
+)
+def _history_usage():
+    history = _history()
+    return lambda: history.usage
+
+
+def time_operation(operation: Callable[[], Any], repeat: int) -> float:
+    """best-of-repeat seconds per call"""
+    timer = timeit.Timer(operation)
+    # autorange() finds a number of calls taking at least 0.2 seconds
+    number, _ = timer.autorange()
+    number = max(1, int(number * MIN_SECONDS / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run_suite(pattern: Optional[str], repeat: int) -> dict[str, float]:
+    results = {}
+    for name, (setup, _) in BENCHMARKS.items():
+        if (pattern is not None) and (re.search(pattern, name) is None):
+            continue
+        results[name] = time_operation(setup(), repeat)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """short hash of HEAD, marked "+dirty" if the tree has changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("+dirty" if status else "")
+
+
+def load_records(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+def find_baseline(
+    records: list[dict], commit: Optional[str], current: Optional[str]
+) -> Optional[dict]:
+    """
+    the most recent record for commit (a prefix) or, if commit is None,
+    the most recent record from a commit other than current
+    """
+    for record in reversed(records):
+        recorded = record.get("commit") or ""
+        if commit is not None:
+            if recorded.startswith(commit):
+                return record
+        elif recorded.split("+")[0] != (current or "").split("+")[0]:
+            return record
+    return None
+
+
+def compare(
+    results: dict[str, float],
+    baseline: Optional[dict],
+    tolerance: float,
+) -> bool:
+    """print results (against baseline); return False on any regression"""
+    previous = baseline["results"] if baseline is not None else {}
+    if baseline is not None:
+        print(f"baseline: {baseline.get('commit')} ({baseline.get('time')})")
+    print(f"{'benchmark':<40}{'us/op':>12}{'baseline':>12}{'ratio':>8}")
+    passed = True
+    for name, seconds in results.items():
+        row = f"{name:<40}{seconds * 1e6:>12.3f}"
+        if name in previous:
+            ratio = seconds / previous[name]
+            limit = BENCHMARKS[name][1] or tolerance
+            status = ""
+            if ratio > limit:
+                status, passed = "  REGRESSION", False
+            row += f"{previous[name] * 1e6:>12.3f}{ratio:>8.2f}{status}"
+        print(row)
+    return passed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--filter", default=None, help="run benchmarks matching this regex"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--save", action="store_true", help="append results to --results"
+    )
+    parser.add_argument("--results", type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="compare against the latest results for this commit (default: "
+        "the latest results from any other commit)",
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+    commit = git_commit()
+    records = load_records(args.results)
+    baseline = find_baseline(records, args.baseline, commit)
+    if (args.baseline is not None) and (baseline is None):
+        print(f"no results for {args.baseline} in {args.results}")
+        return 2
+    results = run_suite(args.filter, args.repeat)
+    passed = compare(results, baseline, args.tolerance)
+    if args.save is True:
+        record = {
+            "commit": commit,
+            "time": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results,
+        }
+        args.results.parent.mkdir(parents=True, exist_ok=True)
+        with args.results.open("a", encoding="utf-8") as stream:
+            stream.write(json.dumps(record) + "\n")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
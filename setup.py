@@ -6,11 +6,27 @@ setup(
     packages=["antiscope"],
     py_modules=[
         "antiscope.__init__",
+        "antiscope.artifacts",
+        "antiscope.cassette",
+        "antiscope.codecache",
+        "antiscope.context",
         "antiscope.dynamic",
         "antiscope.evocation",
+        "antiscope.extract",
+        "antiscope.governor",
+        "antiscope.history",
+        "antiscope.implication_store",
+        "antiscope.instrument",
         "antiscope.irrealis",
         "antiscope.openai_settings",
         "antiscope.openai_utils",
+        "antiscope.response_cache",
+        "antiscope.schema",
+        "antiscope.serializers",
+        "antiscope.singleflight",
+        "antiscope.streaming",
+        "antiscope.tokens",
         "antiscope.utilz",
+        "antiscope.validation",
     ],
 )